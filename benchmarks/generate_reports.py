@@ -0,0 +1,131 @@
+"""
+Generates synthetic quarterly reports with the layout of the real ones - the same metadata rows, Hebrew headers, units
+and numbering rows and section totals before the investments, in a "לא סחיר - מניות" sheet among other asset sheets.
+
+Run it from the repository's root as a module - ``python -m benchmarks.generate_reports``.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+from typing import TYPE_CHECKING, List
+
+import openpyxl
+
+from quarterly_diff.parsers import ExcelParser
+
+if TYPE_CHECKING:
+    from typing import Any, Optional, Sequence
+
+XLS_MAX_ROWS = 65536
+FILLER_SHEET_NAMES = ("סכום נכסי הקרן", "מזומנים", "מניות", 'אג"ח קונצרני', "קרנות סל")
+HEADERS = ["שם המנפיק/שם נייר ערך", 'מספר ני"ע', "ספק המידע", "מספר מנפיק", "ענף מסחר", "סוג מטבע", "ערך נקוב****",
+           "שער***", "שווי הוגן", "שעור מערך נקוב מונפק", "שעור מנכסי אפיק ההשקעה", "שעור מסך נכסי השקעה**"]
+CATEGORIES = ("השקעות בהייטק", "אשראי חוץ בנקאי", "נדל\"ן ובינוי", "ביוטכנולוגיה", "אנרגיה")
+CURRENCIES = ("שקל חדש", "דולר אמריקאי", "אירו")
+
+
+def _header_rows(fund_name: str) -> List[List[Any]]:
+    """
+    The rows before the first investment, which start at row 13 like in the real reports.
+    """
+    return [
+        [None, "תאריך הדיווח", "31/12/2022"],
+        [None, "החברה המדווחת", fund_name],
+        [None, "שם מסלול/קרן/קופה", f"{fund_name} - מסלול כללי"],
+        [None, "מספר מסלול/קרן/קופה", 2102],
+        [],
+        [None, "1.ג. ניירות ערך לא סחירים"],
+        [None, "4. מניות"],
+        [None] + HEADERS,
+        [None, None, None, None, None, None, None, "יחידות", None, 'אלפי ש"ח', "אחוזים", "אחוזים", "אחוזים"],
+        [None] + [f"({i})" for i in range(1, len(HEADERS))],
+        [None, 'סה"כ מניות'],
+        [None, 'סה"כ בישראל'],
+    ]
+
+
+def investment_rows(rows: int, seed: int = 0, nominal_value_change: float = 0.0) -> List[List[Any]]:
+    """
+    :param rows: Amount of investment rows
+    :param seed: Same seeds generate the same holdings
+    :param nominal_value_change: Fraction of the holdings whose nominal value is changed, to simulate a later quarter
+    """
+    generator = random.Random(seed)
+    change_generator = random.Random(seed + 1)
+    investments = []
+    for index in range(rows):
+        # Roughly every tenth holding is split over two rows, which the parser sums
+        issuer = index - 1 if index % 10 == 9 else index
+        share_value = round(random.Random(issuer).uniform(1, 5000), 4)
+        nominal_value = round(generator.uniform(1, 1_000_000), 2)
+        if change_generator.random() < nominal_value_change:
+            nominal_value = round(nominal_value * change_generator.uniform(0.5, 1.5), 2)
+        investments.append([None, f"חברה {issuer}", 9000 + issuer, "אחר", str(510000000 + issuer),
+                            CATEGORIES[issuer % len(CATEGORIES)], CURRENCIES[issuer % len(CURRENCIES)],
+                            nominal_value, share_value, round(nominal_value * share_value / 100_000, 2),
+                            0.0, 0.0, 0.0])
+    return investments
+
+
+def _sheets_rows(rows: int, fund_name: str, seed: int, nominal_value_change: float, filler_rows: Optional[int]):
+    for sheet_name in FILLER_SHEET_NAMES:
+        yield sheet_name, _header_rows(fund_name) + investment_rows(rows if filler_rows is None else filler_rows,
+                                                                   seed=seed + len(sheet_name))
+    yield ExcelParser.STAKE_SHEET_NAME, _header_rows(fund_name) + \
+        investment_rows(rows, seed=seed, nominal_value_change=nominal_value_change)
+
+
+def write_xlsx_report(path: str, rows: int, *,  # pylint: disable=too-many-arguments
+                      fund_name: str = "קרן לדוגמה", seed: int = 0,
+                      nominal_value_change: float = 0.0, filler_rows: Optional[int] = None) -> str:
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_name, sheet_rows in _sheets_rows(rows, fund_name, seed, nominal_value_change, filler_rows):
+        sheet = workbook.create_sheet(title=sheet_name)
+        for row in sheet_rows:
+            sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def write_xls_report(path: str, rows: int, *,  # pylint: disable=too-many-arguments
+                     fund_name: str = "קרן לדוגמה", seed: int = 0,
+                     nominal_value_change: float = 0.0, filler_rows: Optional[int] = None) -> str:
+    import xlwt  # type: ignore  # pylint: disable=import-outside-toplevel  # Only needed to generate .xls reports
+
+    if rows + len(_header_rows(fund_name)) > XLS_MAX_ROWS:
+        raise ValueError(f".xls sheets are limited to {XLS_MAX_ROWS} rows - {rows} investments don't fit")
+    workbook = xlwt.Workbook(encoding="utf-8")
+    for sheet_name, sheet_rows in _sheets_rows(rows, fund_name, seed, nominal_value_change, filler_rows):
+        sheet = workbook.add_sheet(sheet_name)
+        for row_index, row in enumerate(sheet_rows):
+            for column_index, value in enumerate(row):
+                if value is not None:
+                    sheet.write(row_index, column_index, value)
+    workbook.save(path)
+    return path
+
+
+def write_report(path: str, rows: int, **kwargs) -> str:
+    if path.endswith(".xls"):
+        return write_xls_report(path, rows, **kwargs)
+    return write_xlsx_report(path, rows, **kwargs)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic quarterly report")
+    arg_parser.add_argument("path", help="Path of the report, its extension selects .xls or .xlsx")
+    arg_parser.add_argument("--rows", type=int, default=1000, help="Amount of investments (default: %(default)s)")
+    arg_parser.add_argument("--filler-rows", type=int, default=None,
+                            help="Amount of rows in each of the other asset sheets (default: same as --rows)")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--nominal-value-change", type=float, default=0.0,
+                            help="Fraction of the investments whose nominal value changes")
+    args = arg_parser.parse_args(argv)
+    write_report(os.path.abspath(args.path), args.rows, seed=args.seed, nominal_value_change=args.nominal_value_change,
+                 filler_rows=args.filler_rows)
+
+
+if __name__ == "__main__":
+    main()
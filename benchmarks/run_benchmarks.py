@@ -0,0 +1,166 @@
+"""
+Measures the wall time and peak memory of every parsing and diffing stage, on the example portfolios and on synthetic
+reports, and saves the results as JSON so runs of different commits can be compared.
+
+Every stage starts from a fresh parser, so a stage's measurements include the stages it depends on - e.g.
+"header_detection" includes opening the workbook. Parsed portfolios aren't cached and sheet layouts aren't looked up
+in the layout registry during the benchmark, so the results don't depend on previous runs.
+
+Run it from the repository's root as a module, so the benchmarks package can be imported::
+
+    python -m benchmarks.run_benchmarks --sizes 1000 10000
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import functools
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.generate_reports import XLS_MAX_ROWS, write_report
+from quarterly_diff import compare_portfolios
+from quarterly_diff.batch import pair_consecutive_quarters, reports_from_directory
+from quarterly_diff.parsers import ExcelParser, set_default_cache, set_default_layout_registry
+
+if TYPE_CHECKING:
+    from typing import Sequence
+
+EXAMPLE_PORTFOLIOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests",
+                                      "test_quarterly_diff", "example_portfolios")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_FORMATS = ("xlsx", "xls")
+
+PARSER_STAGES = {
+    "open_workbook": lambda parser: parser._workbook,  # pylint: disable=protected-access
+    "header_detection": lambda parser: parser.headers_row_idx,
+    "investments": lambda parser: sum(1 for _ in parser.investments),
+    "summed_investments": lambda parser: len(parser.summed_investments),
+}  # type: Dict[str, Callable[[ExcelParser], Any]]
+
+
+def _run_parser_stage(stage_func: Callable[[ExcelParser], Any], path: str) -> None:
+    # Closing the parser releases the workbook, which .xls workbooks keep memory mapped
+    with ExcelParser(path, cache=False) as parser:
+        stage_func(parser)
+
+
+def measure(func: Callable[[], Any]) -> Tuple[float, int]:
+    """
+    :return: The wall time in seconds and the peak traced memory in bytes. The function runs twice, since tracing
+     memory allocations slows it down.
+    """
+    start = time.perf_counter()
+    func()
+    wall_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return wall_time, peak_memory
+
+
+def _result(input_name: str, rows: Optional[int], stage: str, func: Callable[[], Any]) -> Dict[str, Any]:
+    wall_time, peak_memory = measure(func)
+    print(f"{input_name:<40} {stage:<20} {wall_time:>9.3f}s {peak_memory / 1024 / 1024:>9.1f}MiB")
+    return {"input": input_name, "rows": rows, "stage": stage, "wall_time_s": wall_time,
+            "peak_memory_bytes": peak_memory}
+
+
+def benchmark_report_pair(input_name: str, prev_quarter_path: str, quarter_path: str,
+                          rows: Optional[int] = None) -> List[Dict[str, Any]]:
+    results = [_result(input_name, rows, stage, functools.partial(_run_parser_stage, stage_func, quarter_path))
+               for stage, stage_func in PARSER_STAGES.items()]
+    results.append(_result(input_name, rows, "compare_portfolios",
+                           lambda: compare_portfolios(prev_quarter_path, quarter_path)))
+    return results
+
+
+def benchmark_examples() -> List[Dict[str, Any]]:
+    results = []  # type: List[Dict[str, Any]]
+    for fund, pairs in pair_consecutive_quarters(reports_from_directory(EXAMPLE_PORTFOLIOS_DIR)).items():
+        for prev_report, report in pairs:
+            results.extend(benchmark_report_pair(os.path.basename(report.path), prev_report.path, report.path))
+        if not pairs:  # A single quarter - diff it against itself
+            (report,) = [report for report in reports_from_directory(EXAMPLE_PORTFOLIOS_DIR) if report.fund == fund]
+            results.extend(benchmark_report_pair(os.path.basename(report.path), report.path, report.path))
+    return results
+
+
+def _synthetic_report(work_dir: str, rows: int, extension: str, quarter: int, nominal_value_change: float) -> str:
+    path = os.path.join(work_dir, f"synthetic_{rows}_{quarter}_22.{extension}")
+    if not os.path.exists(path):
+        write_report(path, rows, nominal_value_change=nominal_value_change)
+    return path
+
+
+def benchmark_synthetic(sizes: Sequence[int], formats: Sequence[str], work_dir: str) -> List[Dict[str, Any]]:
+    """
+    Synthetic reports are generated once into work_dir and reused by later runs.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    results = []  # type: List[Dict[str, Any]]
+    for extension in formats:
+        for rows in sizes:
+            if extension == "xls" and rows >= XLS_MAX_ROWS:
+                print(f"Skipping {rows} rows .xls - the format is limited to {XLS_MAX_ROWS} rows")
+                continue
+            prev_quarter_path = _synthetic_report(work_dir, rows, extension, quarter=3, nominal_value_change=0.0)
+            quarter_path = _synthetic_report(work_dir, rows, extension, quarter=4, nominal_value_change=0.1)
+            results.extend(benchmark_report_pair(os.path.basename(quarter_path), prev_quarter_path, quarter_path,
+                                                 rows=rows))
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark the parsing and diffing stages")
+    arg_parser.add_argument("--sizes", type=int, nargs="*", default=list(DEFAULT_SIZES),
+                            help="Investment rows of the synthetic reports (default: %(default)s)")
+    arg_parser.add_argument("--formats", nargs="*", choices=DEFAULT_FORMATS, default=list(DEFAULT_FORMATS),
+                            help="Formats of the synthetic reports (default: %(default)s)")
+    arg_parser.add_argument("--skip-examples", action="store_true", help="Don't benchmark the example portfolios")
+    arg_parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "quarterly_diff_benchmarks"),
+                            help="Where the synthetic reports are generated (default: %(default)s)")
+    arg_parser.add_argument("--output", default="benchmark_results.json", help="(default: %(default)s)")
+    arg_parser.add_argument("--xlsx-backend", choices=list(ExcelParser.XLSX_BACKENDS),
+                            default=ExcelParser.DEFAULT_XLSX_BACKEND, help="(default: %(default)s)")
+    args = arg_parser.parse_args(argv)
+
+    set_default_cache(None)
+    set_default_layout_registry(None)
+    ExcelParser.DEFAULT_XLSX_BACKEND = args.xlsx_backend
+    results = [] if args.skip_examples else benchmark_examples()
+    results.extend(benchmark_synthetic(args.sizes, args.formats, args.work_dir))
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump({
+            "metadata": {
+                "commit": _git_commit(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "xlsx_backend": args.xlsx_backend,
+            },
+            "results": results,
+        }, output, indent=2, ensure_ascii=False)
+    print(f"Results saved at {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,16 @@
 # https://github.com/ParthJadhav/Tkinter-Designer
 import os.path
 import sys
-from dataclasses import asdict, fields
 from pathlib import Path
-from threading import Thread
+from multiprocessing import freeze_support
 # Explicit imports to satisfy Flake8
 from tkinter import Canvas, Text, Button, PhotoImage, Frame, LEFT, HORIZONTAL, Toplevel, Label, font
 from tkinter.ttk import Progressbar
-from typing import List, Tuple, Dict, Generator
 
-import openpyxl
 from PIL import ImageTk, Image
 
-from quarterly_diff import compare_portfolios, CompanyInvestment
+from quarterly_diff import submit_comparison, ComparisonError, ProgressReporter
+from quarterly_diff.exporter import export
 from tkinterdnd2.tkinterdnd2 import TkinterDnD, DND_FILES
 
 OUTPUT_PATH = Path(__file__).parent
@@ -37,41 +35,7 @@ def relative_to_assets(path: str) -> Path:
 
 prev_quarter_path = ""
 curr_quarter_path = ""
-is_running = False
-
-
-def dict_to_excel(output_path: str, fieldnames: List[str], *args: Tuple[str, Generator[Dict, None, None]], force: bool=True):
-    """
-
-    :param output_path: Where to save the Excel
-    :param fieldnames: The names of the fields in each dict,
-    :param args: Tuples of (name of the sheet, iterator of sheet data)
-    :param force: Should overwrite the file in output path
-    :return:
-    """
-    # create a new workbook
-    if force and os.path.exists(output_path):
-        os.remove(output_path)
-    wb = openpyxl.Workbook()
-    for i, values_tuple in enumerate(args):
-        sheet_name, values_iter = values_tuple
-        ws = wb.create_sheet(title=sheet_name, index=i)
-        ws.sheet_view.rightToLeft = True
-
-        # append headers
-        ws.append(fieldnames)
-
-        # append data
-        # iterate `list` of `dict`
-        for value in values_iter:
-            # create a `generator` yield value `value`
-            # use the fieldnames in desired order as `key`
-            values = (value[k] for k in fieldnames)
-
-            # append the `generator values`
-            ws.append(values)
-
-    wb.save(output_path)
+comparison = None
 
 
 def popup(message, title=None):
@@ -100,207 +64,215 @@ def popup(message, title=None):
     popup_window.lift()
 
 
-def _asdict_with_properties(obj, *properties_names):
-    result = asdict(obj)
-    for property_name in properties_names:
-        result[property_name] = getattr(obj, property_name)
-    return result
-
 def save_diff_result():
-    global is_running
-    if is_running:
+    global comparison
+    if comparison is not None and not comparison.done():
         popup(message="The program is already running!", title="Warning")
         return
-    is_running = True
     progress_bar = Progressbar(
         window,
         orient=HORIZONTAL,
         length=150,
-        mode='indeterminate'
+        mode='determinate',
+        maximum=100
     )
     progress_bar.place(x=645, y=575)
-    progress_bar.start()
-    try:
-        output_path = os.path.abspath(r"results.xlsx")
-        new_investments, updated_investments, deprecated_investments = compare_portfolios(prev_quarter_path,
-                                                                                          curr_quarter_path)
-        dict_to_excel(output_path, [field.name for field in fields(CompanyInvestment)] + ["calculated_fair_value"],
-                      ("updated investments", (_asdict_with_properties(inv, "calculated_fair_value") for inv in updated_investments.values())),
-                      ("new investments", (_asdict_with_properties(inv, "calculated_fair_value") for inv in new_investments.values())),
-                      ("deprecated investments", (_asdict_with_properties(inv, "calculated_fair_value") for inv in deprecated_investments.values())),
-                      force=True
-                      )
-        popup(title="success", message=f"Done :) Results saved at {output_path}")
-    except Exception as e:
-        popup(title="error", message=f"Got error: {e}")
-    progress_bar.stop()
-    progress_bar.destroy()
-    is_running = False
-
-
-window = TkinterDnD.Tk()
-window.title("Quarterly diff tool")
-icon = Image.open(resource_path(r"assets/ivc.png"))
-photo = ImageTk.PhotoImage(icon)
-window.wm_iconphoto(False, photo)
-
-window.geometry("1440x626")
-
-window.configure(bg="#FFFFFF")
-canvas = Canvas(
-    window,
-    bg="#FFFFFF",
-    height=626,
-    width=1440,
-    bd=0,
-    highlightthickness=0,
-    relief="ridge"
-)
-
-# Background
-canvas.place(x=0, y=0)
-
-# Prev quarter
-canvas.create_rectangle(
-    720.0,
-    0.0,
-    1440.0,
-    626.0,
-    fill="#7FE4D2",
-    outline="")
-canvas.create_rectangle(
-    805.0,
-    181.0,
-    1358.0,
-    512.0,
-    fill="#FFFFFF",
-    outline="")
-
-# White rectangle area
-prev = canvas.create_rectangle(
-    839.0,
-    118.0,
-    1320.0,
-    162.0,
-    fill="#FFFFFF",
-    outline="")
-
-
-canvas.create_text(
-    856.0,
-    124.0,
-    anchor="nw",
-    text="Drag the current quarter file to the box:",
-    fill="#000000",
-    font=("Inter", 24 * -1)
-)
-
-canvas.create_rectangle(
-    0.0,
-    0.0,
-    720.0,
-    626.0,
-    fill="#475855",
-    outline="")
-
-# current quarter
-canvas.create_rectangle(
-    85.0,
-    181.0,
-    638.0,
-    512.0,
-    fill="#FFFFFF",
-    outline="")
-
-canvas.create_rectangle(
-    119.0,
-    118.0,
-    600.0,
-    162.0,
-    fill="#FFFFFF",
-    outline="")
-
-canvas.create_text(
-    128.0,
-    124.0,
-    anchor="nw",
-    text="Drag the previous quarter file to the box:",
-    fill="#000000",
-    font=("Inter", 24 * -1)
-)
-
-canvas.create_text(
-    124.0,
-    50.0,
-    anchor="nw",
-    text='share value - שער, securities id - מספר נייר ערך, issuer id - מספר מנפיק, nominal value - ערך נקוב\n'
-         'calculated fair value - שווי הוגן - share value * nominal value / 100',
-    fill="#000000",
-    font=("Inter", 24 * -1)
-)
-button_image_1 = PhotoImage(
-    file=relative_to_assets("button_1.png"))
-
-button_1 = Button(
-    image=button_image_1,
-    borderwidth=0,
-    highlightthickness=0,
-    command=lambda: Thread(target=save_diff_result).start(),
-    relief="flat"
-)
-button_1.place(
-    x=667.0,
-    y=450.0,
-    width=107.0,
-    height=107.0
-)
-
-# canvas.create_rectangle(
-#     0.0,
-#     625.0,
-#     1440.0,
-#     1024.0,
-#     fill="#F4F4F4",
-#     outline="")
-#
-# canvas.create_rectangle(
-#     56.0,
-#     673.0,
-#     1389.0,
-#     959.0,
-#     fill="#FFFFFF",
-#     outline="")
-
-prev_quarter_frame = Frame(window)
-prev_quarter_frame.place(x=85, y=181)
-prev_quarter_textarea = Text(prev_quarter_frame, height=18, width=68)
-
-curr_quarter_frame = Frame(window)
-curr_quarter_frame.place(x=805, y=181)
-curr_quarter_textarea = Text(curr_quarter_frame, height=18, width=68)
-
-
-def load_prev_path(event):
-    global prev_quarter_path
-    prev_quarter_textarea.delete("1.0", "end")
-    prev_quarter_textarea.insert("end", event.data)
-    prev_quarter_path = event.data
-
-
-def load_curr_path(event):
-    global curr_quarter_path
-    curr_quarter_textarea.delete("1.0", "end")
-    curr_quarter_textarea.insert("end", event.data)
-    curr_quarter_path = event.data
-
-
-prev_quarter_textarea.pack(side=LEFT)
-prev_quarter_textarea.drop_target_register(DND_FILES)
-prev_quarter_textarea.dnd_bind('<<Drop>>', load_prev_path)
-
-curr_quarter_textarea.pack(side=LEFT)
-curr_quarter_textarea.drop_target_register(DND_FILES)
-curr_quarter_textarea.dnd_bind('<<Drop>>', load_curr_path)
-
-window.resizable(False, False)
-window.mainloop()
+    # Tk widgets may only be updated from the main thread
+    progress = ProgressReporter([prev_quarter_path, curr_quarter_path],
+                                lambda fraction: window.after(0, progress_bar.configure, {"value": fraction * 100}))
+    # Both quarters are parsed in their own processes, and cancelling the comparison terminates them
+    current_comparison = comparison = submit_comparison(prev_quarter_path, curr_quarter_path, observer=progress)
+    cancel_button = Button(window, text="Cancel", command=current_comparison.cancel)
+    cancel_button.place(x=800, y=572)
+
+    def show_result():
+        progress_bar.destroy()
+        cancel_button.destroy()
+        if current_comparison.cancelled():
+            popup(title="cancelled", message="The comparison was cancelled")
+            return
+        try:
+            output_path = os.path.abspath(r"results.xlsx")
+            new_investments, updated_investments, deprecated_investments = current_comparison.result()
+            export(output_path,
+                   ("updated investments", updated_investments),
+                   ("new investments", new_investments),
+                   ("deprecated investments", deprecated_investments))
+            popup(title="success", message=f"Done :) Results saved at {output_path}")
+        except ComparisonError as e:
+            popup(title="error", message="\n".join(f"Couldn't parse {path}: {error}" for path, error in e.errors.items()))
+        except Exception as e:
+            popup(title="error", message=f"Got error: {e}")
+
+    current_comparison.add_done_callback(lambda _: window.after(0, show_result))
+
+
+# The parsing processes import this module when they are spawned, and shouldn't open a window of their own
+if __name__ == "__main__":
+    freeze_support()
+    window = TkinterDnD.Tk()
+    window.title("Quarterly diff tool")
+    icon = Image.open(resource_path(r"assets/ivc.png"))
+    photo = ImageTk.PhotoImage(icon)
+    window.wm_iconphoto(False, photo)
+
+    window.geometry("1440x626")
+
+    window.configure(bg="#FFFFFF")
+    canvas = Canvas(
+        window,
+        bg="#FFFFFF",
+        height=626,
+        width=1440,
+        bd=0,
+        highlightthickness=0,
+        relief="ridge"
+    )
+
+    # Background
+    canvas.place(x=0, y=0)
+
+    # Prev quarter
+    canvas.create_rectangle(
+        720.0,
+        0.0,
+        1440.0,
+        626.0,
+        fill="#7FE4D2",
+        outline="")
+    canvas.create_rectangle(
+        805.0,
+        181.0,
+        1358.0,
+        512.0,
+        fill="#FFFFFF",
+        outline="")
+
+    # White rectangle area
+    prev = canvas.create_rectangle(
+        839.0,
+        118.0,
+        1320.0,
+        162.0,
+        fill="#FFFFFF",
+        outline="")
+
+
+    canvas.create_text(
+        856.0,
+        124.0,
+        anchor="nw",
+        text="Drag the current quarter file to the box:",
+        fill="#000000",
+        font=("Inter", 24 * -1)
+    )
+
+    canvas.create_rectangle(
+        0.0,
+        0.0,
+        720.0,
+        626.0,
+        fill="#475855",
+        outline="")
+
+    # current quarter
+    canvas.create_rectangle(
+        85.0,
+        181.0,
+        638.0,
+        512.0,
+        fill="#FFFFFF",
+        outline="")
+
+    canvas.create_rectangle(
+        119.0,
+        118.0,
+        600.0,
+        162.0,
+        fill="#FFFFFF",
+        outline="")
+
+    canvas.create_text(
+        128.0,
+        124.0,
+        anchor="nw",
+        text="Drag the previous quarter file to the box:",
+        fill="#000000",
+        font=("Inter", 24 * -1)
+    )
+
+    canvas.create_text(
+        124.0,
+        50.0,
+        anchor="nw",
+        text='share value - שער, securities id - מספר נייר ערך, issuer id - מספר מנפיק, nominal value - ערך נקוב\n'
+             'calculated fair value - שווי הוגן - share value * nominal value / 100',
+        fill="#000000",
+        font=("Inter", 24 * -1)
+    )
+    button_image_1 = PhotoImage(
+        file=relative_to_assets("button_1.png"))
+
+    button_1 = Button(
+        image=button_image_1,
+        borderwidth=0,
+        highlightthickness=0,
+        command=save_diff_result,
+        relief="flat"
+    )
+    button_1.place(
+        x=667.0,
+        y=450.0,
+        width=107.0,
+        height=107.0
+    )
+
+    # canvas.create_rectangle(
+    #     0.0,
+    #     625.0,
+    #     1440.0,
+    #     1024.0,
+    #     fill="#F4F4F4",
+    #     outline="")
+    #
+    # canvas.create_rectangle(
+    #     56.0,
+    #     673.0,
+    #     1389.0,
+    #     959.0,
+    #     fill="#FFFFFF",
+    #     outline="")
+
+    prev_quarter_frame = Frame(window)
+    prev_quarter_frame.place(x=85, y=181)
+    prev_quarter_textarea = Text(prev_quarter_frame, height=18, width=68)
+
+    curr_quarter_frame = Frame(window)
+    curr_quarter_frame.place(x=805, y=181)
+    curr_quarter_textarea = Text(curr_quarter_frame, height=18, width=68)
+
+
+    def load_prev_path(event):
+        global prev_quarter_path
+        prev_quarter_textarea.delete("1.0", "end")
+        prev_quarter_textarea.insert("end", event.data)
+        prev_quarter_path = event.data
+
+
+    def load_curr_path(event):
+        global curr_quarter_path
+        curr_quarter_textarea.delete("1.0", "end")
+        curr_quarter_textarea.insert("end", event.data)
+        curr_quarter_path = event.data
+
+
+    prev_quarter_textarea.pack(side=LEFT)
+    prev_quarter_textarea.drop_target_register(DND_FILES)
+    prev_quarter_textarea.dnd_bind('<<Drop>>', load_prev_path)
+
+    curr_quarter_textarea.pack(side=LEFT)
+    curr_quarter_textarea.drop_target_register(DND_FILES)
+    curr_quarter_textarea.dnd_bind('<<Drop>>', load_curr_path)
+
+    window.resizable(False, False)
+    window.mainloop()
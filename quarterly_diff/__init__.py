@@ -1,2 +1,6 @@
-from .quarterly_diff import compare_portfolios
+from .quarterly_diff import compare_portfolios, compare_asset_classes, diff_portfolios, PortfolioDiff, InvestmentChange
 from .parsers.company_investment import CompanyInvestment
+from .parsers.portfolio_snapshot import PortfolioSnapshot
+from .parsers.columnar_portfolio import ColumnarPortfolio, diff_columnar_portfolios
+from .parsers.parse_observer import ParseObserver, StageTimer, ProgressReporter
+from .concurrent_diff import submit_comparison, compare_portfolios_concurrently, ComparisonError
@@ -0,0 +1,253 @@
+"""
+Headless batch comparison of every fund in a quarter.
+
+Reports are discovered from a directory of ``<fund>_<quarter>_<yy>.xls[x]`` files or from a CSV manifest with the
+columns ``fund,quarter,year,path``. Each fund's reports of consecutive quarters are paired and diffed in a process pool,
+one result file is written per fund and a ``summary.csv`` records the outcome of every pair. Reports with missing
+quarters between them aren't compared, and are recorded as skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .exporter import EXPORTERS, Section, diff_sections, export
+from .parsers import ExcelParser, StageTimer
+from .parsers.parse_observer import DIFF, observed_stage
+from .quarterly_diff import diff_portfolios
+
+if TYPE_CHECKING:
+    from typing import Iterable, Sequence
+    from .parsers import ParseObserver, PortfolioSnapshot, StageTiming
+
+REPORT_FILE_PATTERN = re.compile(r"^(?P<fund>.+)_(?P<quarter>[1-4])_(?P<year>\d{2})\.(?P<extension>xlsx?)$")
+SUMMARY_FILE_NAME = "summary.csv"
+SUMMARY_FIELDNAMES = ["fund", "previous_quarter", "quarter", "new", "updated", "deprecated", "status", "error"]
+
+
+@dataclass(frozen=True, order=True)
+class QuarterlyReport:
+    fund: str
+    year: int
+    quarter: int
+    path: str = field(compare=False)
+
+    @property
+    def label(self) -> str:
+        return f"{self.quarter}_{self.year}"
+
+    def follows(self, report: QuarterlyReport) -> bool:
+        """
+        Whether this is the report of the quarter right after the report's quarter.
+        """
+        return (self.year, self.quarter) == ((report.year, report.quarter + 1) if report.quarter < 4 else
+                                             (report.year + 1, 1))
+
+
+@dataclass
+class PairResult:  # pylint: disable=too-many-instance-attributes
+    fund: str
+    previous_quarter: str
+    quarter: str
+    period: Tuple[int, int]  # The year and quarter of the later report, which orders the results
+    new: int = 0
+    updated: int = 0
+    deprecated: int = 0
+    error: str = ""
+    skipped: bool = False  # Not compared since quarters between the two are missing, which the error names
+
+    @property
+    def status(self) -> str:
+        if self.skipped:
+            return "skipped"
+        return "failed" if self.error else "ok"
+
+    @classmethod
+    def of_pair(cls, fund: str, prev_report: QuarterlyReport, report: QuarterlyReport, **kwargs: Any) -> PairResult:
+        return cls(fund=fund, previous_quarter=prev_report.label, quarter=report.label,
+                   period=(report.year, report.quarter), **kwargs)
+
+
+def reports_from_directory(directory: str) -> List[QuarterlyReport]:
+    """
+    When a report exists both as .xls and .xlsx, the .xlsx file is used.
+    """
+    reports = {}  # type: Dict[Tuple[str, int, int], QuarterlyReport]
+    for file_name in sorted(os.listdir(directory)):
+        match = REPORT_FILE_PATTERN.match(file_name)
+        if not match:
+            continue
+        report = QuarterlyReport(fund=match["fund"], year=int(match["year"]), quarter=int(match["quarter"]),
+                                 path=os.path.join(directory, file_name))
+        key = (report.fund, report.year, report.quarter)
+        if key not in reports or match["extension"] == "xlsx":
+            reports[key] = report
+    return sorted(reports.values())
+
+
+def reports_from_manifest(manifest_path: str) -> List[QuarterlyReport]:
+    """
+    Relative paths in the manifest are resolved against the manifest's directory.
+    """
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline="", encoding="utf-8") as manifest:
+        return sorted(QuarterlyReport(fund=row["fund"], year=int(row["year"]), quarter=int(row["quarter"]),
+                                      path=os.path.join(manifest_dir, row["path"]))
+                      for row in csv.DictReader(manifest))
+
+
+def _pair_adjacent_reports(reports: Iterable[QuarterlyReport]) -> Dict[str, List[Tuple[QuarterlyReport,
+                                                                                        QuarterlyReport]]]:
+    reports_by_fund = defaultdict(list)  # type: Dict[str, List[QuarterlyReport]]
+    for report in sorted(reports):
+        reports_by_fund[report.fund].append(report)
+    return {fund: list(zip(fund_reports, fund_reports[1:])) for fund, fund_reports in reports_by_fund.items()}
+
+
+def pair_consecutive_quarters(reports: Iterable[QuarterlyReport]) -> Dict[str, List[Tuple[QuarterlyReport,
+                                                                                           QuarterlyReport]]]:
+    """
+    Pairs every report of a fund with the report of the following quarter, if it exists.
+    """
+    return {fund: [(prev_report, report) for prev_report, report in pairs if report.follows(prev_report)]
+            for fund, pairs in _pair_adjacent_reports(reports).items()}
+
+
+def quarter_gaps(reports: Iterable[QuarterlyReport]) -> Dict[str, List[Tuple[QuarterlyReport, QuarterlyReport]]]:
+    """
+    :return: The reports of every fund that are followed by a later quarter's report, with the quarters between them
+     missing
+    """
+    return {fund: [(prev_report, report) for prev_report, report in pairs if not report.follows(prev_report)]
+            for fund, pairs in _pair_adjacent_reports(reports).items()}
+
+
+def compare_fund(fund: str, pairs: Sequence[Tuple[QuarterlyReport, QuarterlyReport]], output_dir: str,
+                 output_format: str = ".xlsx", observer: Optional[ParseObserver] = None) -> List[PairResult]:
+    """
+    Diffs every pair of a single fund, parsing each report once, and writes the fund's result workbook.
+    A report that fails to parse only fails the pairs it is part of.
+
+    :param observer: Follows the stages of parsing the reports, diffing them and exporting the result
+    """
+    snapshots = {}  # type: Dict[str, PortfolioSnapshot]
+    errors = {}  # type: Dict[str, str]
+    for report in {report for pair in pairs for report in pair}:
+        try:
+            with ExcelParser(report.path, observer=observer) as parser:
+                snapshots[report.path] = parser.snapshot
+        except Exception as error:  # pylint: disable=broad-except
+            errors[report.path] = f"{os.path.basename(report.path)}: {error!r}"
+
+    results = []
+    sections = []  # type: List[Section]
+    for prev_report, report in pairs:
+        result = PairResult.of_pair(fund, prev_report, report)
+        results.append(result)
+        result.error = "; ".join(errors[path] for path in (prev_report.path, report.path) if path in errors)
+        if result.error:
+            continue
+        with observed_stage(observer, report.path, DIFF):
+            diff = diff_portfolios(snapshots[prev_report.path], snapshots[report.path])
+        result.new = len(diff.new_investments)
+        result.updated = len(diff.updated_investments)
+        result.deprecated = len(diff.deprecated_investments)
+        sections.extend(diff_sections(diff, suffix=report.label))
+
+    if sections:
+        export(os.path.join(output_dir, f"{fund}{output_format}"), *sections, observer=observer)
+    return results
+
+
+def _timed_compare_fund(fund: str, pairs: Sequence[Tuple[QuarterlyReport, QuarterlyReport]], output_dir: str,
+                        output_format: str) -> Tuple[List[PairResult], List[StageTiming]]:
+    # Observers can't follow a pool worker, so its stage timings are sent back with its results
+    timer = StageTimer()
+    return compare_fund(fund, pairs, output_dir, output_format, observer=timer), timer.timings
+
+
+def write_summary(output_path: str, results: Iterable[PairResult]) -> None:
+    with open(output_path, "w", newline="", encoding="utf-8") as summary:
+        writer = csv.writer(summary)
+        writer.writerow(SUMMARY_FIELDNAMES)
+        for result in results:
+            writer.writerow([result.fund, result.previous_quarter, result.quarter, result.new, result.updated,
+                             result.deprecated, result.status, result.error])
+
+
+def run_batch(reports: Iterable[QuarterlyReport], output_dir: str, max_workers: Optional[int] = None,
+              output_format: str = ".xlsx", observer: Optional[ParseObserver] = None) -> List[PairResult]:
+    """
+    :param reports: The reports of every fund to compare
+    :param output_dir: Where the result files and the summary are written
+    :param max_workers: Size of the process pool, defaults to the number of CPUs
+    :param output_format: Extension of the result files - .xlsx, .csv or .jsonl
+    :param observer: Gets the timing of every stage of every fund once the fund is compared
+    :return: The result of every compared pair, failed pairs and pairs with missing quarters between them included
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    reports = list(reports)
+    pairs_by_fund = {fund: pairs for fund, pairs in pair_consecutive_quarters(reports).items() if pairs}
+    results = [PairResult.of_pair(fund, prev_report, report, skipped=True,
+                                  error=f"The quarters between {prev_report.label} and {report.label} are missing")
+               for fund, gaps in quarter_gaps(reports).items() for prev_report, report in gaps]
+    if pairs_by_fund:
+        max_workers = min(max_workers or os.cpu_count() or 1, len(pairs_by_fund))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_timed_compare_fund, fund, pairs, output_dir, output_format): fund
+                       for fund, pairs in pairs_by_fund.items()}
+            for future in as_completed(futures):
+                fund = futures[future]
+                try:
+                    fund_results, timings = future.result()
+                except Exception as error:  # pylint: disable=broad-except
+                    results.extend(PairResult.of_pair(fund, prev_report, report, error=repr(error))
+                                   for prev_report, report in pairs_by_fund[fund])
+                    continue
+                results.extend(fund_results)
+                if observer is not None:
+                    for timing in timings:
+                        observer.stage_started(timing.source, timing.stage)
+                        observer.stage_finished(timing.source, timing.stage, timing.elapsed)
+
+    results.sort(key=lambda result: (result.fund, result.period))
+    write_summary(os.path.join(output_dir, SUMMARY_FILE_NAME), results)
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Compare consecutive quarterly reports of many funds")
+    source = arg_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--directory", help="Directory of <fund>_<quarter>_<yy>.xls[x] reports")
+    source.add_argument("--manifest", help="CSV manifest with the columns fund,quarter,year,path")
+    arg_parser.add_argument("--output", default="results", help="Output directory (default: %(default)s)")
+    arg_parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    arg_parser.add_argument("--format", choices=[extension.lstrip(".") for extension in EXPORTERS], default="xlsx",
+                            help="Format of the per fund results (default: %(default)s)")
+    arg_parser.add_argument("--timings", action="store_true", help="Print the total time of every stage")
+    args = arg_parser.parse_args(argv)
+
+    reports = reports_from_directory(args.directory) if args.directory else reports_from_manifest(args.manifest)
+    timer = StageTimer()
+    results = run_batch(reports, args.output, max_workers=args.workers, output_format=f".{args.format}",
+                        observer=timer)
+    for result in results:
+        print(f"{result.fund} {result.previous_quarter} -> {result.quarter}: " +
+              (f"{result.status} - {result.error}" if result.error else
+               f"{result.new} new, {result.updated} updated, {result.deprecated} deprecated"))
+    if args.timings:
+        for stage, elapsed in timer.totals().items():
+            print(f"{stage}: {elapsed:.3f}s")
+    print(f"Summary saved at {os.path.abspath(os.path.join(args.output, SUMMARY_FILE_NAME))}")
+    return 1 if any(result.status == "failed" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Compares two quarters while parsing both reports at once, each in its own process since the parsers hold the GIL.
+
+The comparison is a ``concurrent.futures.Future`` - it can be waited on with a timeout, awaited through
+``asyncio.wrap_future`` and cancelled, which terminates the parsing processes.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import wait
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .parsers import ExcelParser
+from .parsers.parse_observer import DIFF, ParseObserver, observed_stage
+from .quarterly_diff import diff_portfolios
+
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from multiprocessing.process import BaseProcess
+    from .parsers import InvestmentPortfolio, PortfolioSnapshot
+
+ComparisonResult = Tuple["InvestmentPortfolio", "InvestmentPortfolio", "InvestmentPortfolio"]
+
+_POLL_INTERVAL = 0.1
+
+
+class ComparisonError(Exception):
+    """
+    Raised by a comparison whose reports failed to parse.
+
+    :ivar errors: The error of every report that failed, by its path
+    """
+
+    def __init__(self, errors: Dict[str, BaseException]):
+        self.errors = errors
+        super().__init__("; ".join(f"{os.path.basename(path)}: {error!r}" for path, error in errors.items()))
+
+
+class _PipeObserver(ParseObserver):
+    """
+    Forwards a worker process's parsing events to the observer of the comparison.
+    """
+
+    def __init__(self, connection: Connection):
+        self._connection = connection
+
+    def stage_started(self, source: str, stage: str) -> None:
+        self._connection.send(("stage_started", (source, stage)))
+
+    def stage_finished(self, source: str, stage: str, elapsed: float) -> None:
+        self._connection.send(("stage_finished", (source, stage, elapsed)))
+
+    def rows_processed(self, source: str, rows: int, total_rows: Optional[int]) -> None:
+        self._connection.send(("rows_processed", (source, rows, total_rows)))
+
+
+def _parse_report(path: str, connection: Connection, observed: bool) -> None:
+    """
+    Runs in a worker process, and sends back the report's snapshot or the error that failed it.
+    """
+    try:
+        with ExcelParser(path, observer=_PipeObserver(connection) if observed else None) as parser:
+            connection.send(("snapshot", parser.snapshot))
+    except Exception as error:  # pylint: disable=broad-except
+        try:
+            pickle.dumps(error)
+        except Exception:  # pylint: disable=broad-except
+            error = RuntimeError(repr(error))
+        connection.send(("error", error))
+    finally:
+        connection.close()
+
+
+def _receive_reports(workers: Dict[Connection, Tuple[str, BaseProcess]], cancelled: threading.Event,
+                     observer: Optional[ParseObserver]) -> Optional[
+                         Tuple[Dict[str, PortfolioSnapshot], Dict[str, BaseException]]]:
+    """
+    :param workers: The path and process of every worker, by the pipe it reports through
+    :return: The snapshot or the error of every report, or None if the comparison was cancelled
+    """
+    snapshots = {}  # type: Dict[str, PortfolioSnapshot]
+    errors = {}  # type: Dict[str, BaseException]
+    pending = dict(workers)
+    while pending:
+        ready = wait(list(pending), timeout=_POLL_INTERVAL)  # type: List[Any]
+        if cancelled.is_set():
+            return None  # The workers may have been terminated mid message, so their pipes aren't read anymore
+        for connection in ready:
+            path, process = pending[connection]
+            try:
+                event, args = connection.recv()
+            except (EOFError, OSError):  # A worker that died without reporting back
+                process.join()
+                event, args = "error", RuntimeError(f"The parsing process exited with code {process.exitcode}")
+            if event == "snapshot":
+                snapshots[path] = args
+            elif event == "error":
+                errors[path] = args
+            else:
+                if observer is not None:
+                    getattr(observer, event)(*args)
+                continue
+            del pending[connection]
+            connection.close()
+    return snapshots, errors
+
+
+def _collect(future: Future, paths: Tuple[str, str], workers: Dict[Connection, Tuple[str, BaseProcess]],
+             cancelled: threading.Event, observer: Optional[ParseObserver]) -> None:
+    """
+    Waits for both reports in a background thread, then completes the comparison's future.
+    """
+    reports = _receive_reports(workers, cancelled, observer)
+    if reports is None:
+        return
+    snapshots, errors = reports
+    for _, process in workers.values():
+        process.join()
+    if not future.set_running_or_notify_cancel():
+        return
+    if errors:
+        future.set_exception(ComparisonError(errors))
+        return
+    prev_quarter_path, quarter_path = paths
+    try:
+        with observed_stage(observer, quarter_path, DIFF):
+            diff = diff_portfolios(snapshots[prev_quarter_path], snapshots[quarter_path])
+    except Exception as error:  # pylint: disable=broad-except
+        future.set_exception(error)
+        return
+    future.set_result((diff.new_investments, diff.updated_investments, diff.deprecated_investments))
+
+
+def submit_comparison(prev_quarter_path: str, quarter_path: str,
+                      observer: Optional[ParseObserver] = None) -> Future:
+    """
+    Starts comparing two quarterly reports, parsing each of them in its own process.
+
+    :param observer: Follows the parsing stages of both reports, and the diff
+    :return: A future of the same (new, updated, deprecated) investments compare_portfolios returns. Cancelling it
+     terminates the parsing processes, and if a report fails to parse it raises a ComparisonError with the error of
+     every report that failed.
+    """
+    future = Future()  # type: Future
+    cancelled = threading.Event()
+    workers = {}  # type: Dict[Connection, Tuple[str, BaseProcess]]
+    # Every worker reports through its own pipe, so terminating one can't corrupt what the other sends
+    for path in dict.fromkeys((prev_quarter_path, quarter_path)):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_parse_report, args=(path, sender, observer is not None), daemon=True)
+        process.start()
+        sender.close()  # Only the worker's copy stays open, so its pipe reports EOF once the worker exits
+        workers[receiver] = (path, process)
+
+    def cancel_processes(done_future: Future) -> None:
+        if done_future.cancelled():
+            cancelled.set()
+            for _, worker_process in workers.values():
+                worker_process.terminate()
+                worker_process.join()
+
+    # The future stays pending until both reports are parsed, so it can be cancelled while they are
+    future.add_done_callback(cancel_processes)
+    threading.Thread(target=_collect, args=(future, (prev_quarter_path, quarter_path), workers, cancelled, observer),
+                     daemon=True).start()
+    return future
+
+
+def compare_portfolios_concurrently(prev_quarter_path: str, quarter_path: str, timeout: Optional[float] = None,
+                                    observer: Optional[ParseObserver] = None) -> ComparisonResult:
+    """
+    compare_portfolios, with both reports parsed at once.
+
+    :param timeout: Seconds to wait for the comparison, after which it's cancelled and TimeoutError is raised
+    """
+    future = submit_comparison(prev_quarter_path, quarter_path, observer=observer)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
@@ -0,0 +1,110 @@
+"""
+Writes diff results as they are produced - nothing but the current row is kept in memory.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import os
+from dataclasses import fields
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+import openpyxl
+
+from .parsers.columnar_portfolio import ColumnarPortfolio
+from .parsers.company_investment import CompanyInvestment
+from .parsers.parse_observer import EXPORT, observed_stage
+
+if TYPE_CHECKING:
+    from typing import Iterator, List
+    from .parsers.parse_observer import ParseObserver
+    from .quarterly_diff import PortfolioDiff
+
+INVESTMENT_FIELDNAMES = [field.name for field in fields(CompanyInvestment)] + ["calculated_fair_value"]
+
+Investments = Union[Mapping[Any, CompanyInvestment], ColumnarPortfolio, Iterable[CompanyInvestment]]
+Section = Tuple[str, Investments]  # (name of the section, its investments)
+
+
+investment_row = attrgetter(*INVESTMENT_FIELDNAMES)  # type: Callable[[CompanyInvestment], Tuple[Any, ...]]
+
+
+def section_rows(investments: Investments) -> Iterator[Tuple[Any, ...]]:
+    if isinstance(investments, ColumnarPortfolio):
+        return (row + (fair_value,) for row, fair_value in zip(investments.iter_rows(),
+                                                                investments.iter_calculated_fair_values()))
+    if isinstance(investments, Mapping):
+        investments = investments.values()
+    return (investment_row(investment) for investment in investments)
+
+
+def diff_sections(diff: PortfolioDiff, suffix: str = "") -> List[Section]:
+    """
+    :param suffix: Added to the section names, to tell apart the sections of several diffs
+    """
+    suffix = f" {suffix}" if suffix else ""
+    return [(f"updated investments{suffix}", diff.updated_investments),
+            (f"new investments{suffix}", diff.new_investments),
+            (f"deprecated investments{suffix}", diff.deprecated_investments)]
+
+
+def write_xlsx(output_path: str, *sections: Section) -> None:
+    """
+    Writes each section to its own right-to-left sheet, through a write-only workbook.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_name, investments in sections:
+        sheet = workbook.create_sheet(title=sheet_name)
+        sheet.sheet_view.rightToLeft = True
+        sheet.append(INVESTMENT_FIELDNAMES)
+        for row in section_rows(investments):
+            sheet.append(row)
+    workbook.save(output_path)
+
+
+def write_csv(output_path: str, *sections: Section) -> None:
+    """
+    Writes all the sections to one table, with the section name as its first column.
+    """
+    # The BOM lets Excel detect the encoding of the Hebrew text
+    with open(output_path, "w", newline="", encoding="utf-8-sig") as output:
+        writer = csv.writer(output)
+        writer.writerow(["section"] + INVESTMENT_FIELDNAMES)
+        for section_name, investments in sections:
+            writer.writerows((section_name,) + row for row in section_rows(investments))
+
+
+def write_jsonl(output_path: str, *sections: Section) -> None:
+    """
+    Writes a JSON object per investment, with its section under the "section" key.
+    """
+    with open(output_path, "w", encoding="utf-8") as output:
+        for section_name, investments in sections:
+            for row in section_rows(investments):
+                record = dict(zip(INVESTMENT_FIELDNAMES, row), section=section_name)
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+EXPORTERS = {
+    ".xlsx": write_xlsx,
+    ".csv": write_csv,
+    ".jsonl": write_jsonl,
+}  # type: Dict[str, Callable[..., None]]
+
+
+def export(output_path: str, *sections: Section, force: bool = True,
+           observer: Optional[ParseObserver] = None) -> None:
+    """
+    :param output_path: Where to save the result, its extension selects the format - .xlsx, .csv or .jsonl
+    :param sections: Tuples of (name of the section, its investments)
+    :param force: Should overwrite the file in output path
+    :param observer: Times the export stage, with output_path as its source
+    """
+    extension = os.path.splitext(output_path)[-1]
+    if extension not in EXPORTERS:
+        raise ValueError(f"Only {', '.join(EXPORTERS)} outputs are supported - a {extension} file was requested")
+    if not force and os.path.exists(output_path):
+        raise FileExistsError(f"{output_path} already exists")
+    with observed_stage(observer, output_path, EXPORT):
+        EXPORTERS[extension](output_path, *sections)
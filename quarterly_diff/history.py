@@ -0,0 +1,176 @@
+"""
+A local SQLite store of the holdings of every ingested quarterly report, so multi-quarter and multi-fund questions are
+answered from indexes instead of re-parsing the reports.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from .batch import REPORT_FILE_PATTERN, QuarterlyReport, reports_from_directory
+from .parsers import ExcelParser, PortfolioSnapshot
+from .parsers.company_investment import CompanyInvestment
+from .parsers.excel_parser import id_text
+from .parsers.portfolio_cache import PARSER_VERSION, file_digest
+from .parsers.portfolio_snapshot import investment_key
+from .quarterly_diff import PortfolioDiff, diff_portfolios
+
+if TYPE_CHECKING:
+    from typing import Sequence
+    from .parsers import InvestmentKey
+
+Period = Tuple[int, int]  # (year, quarter), the year as it appears in the report's name
+
+# The parser reads the ids as text, so they match across funds whose reports have numeric ids and text ids
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    fund TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    quarter INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    parser_version TEXT NOT NULL,
+    UNIQUE (fund, year, quarter)
+);
+CREATE TABLE IF NOT EXISTS holdings (
+    report_id INTEGER NOT NULL REFERENCES reports (id) ON DELETE CASCADE,
+    issuer_id TEXT,
+    securities_id TEXT,
+    currency,
+    name,
+    category,
+    share_value REAL,
+    nominal_value REAL
+);
+CREATE INDEX IF NOT EXISTS holdings_report_idx ON holdings (report_id);
+CREATE INDEX IF NOT EXISTS holdings_issuer_idx ON holdings (issuer_id);
+"""
+_HOLDING_COLUMNS = "name, category, share_value, securities_id, issuer_id, currency, nominal_value"
+
+
+@dataclass(frozen=True)
+class Holding:
+    fund: str
+    year: int
+    quarter: int
+    investment: CompanyInvestment
+
+
+class HistoryStore:
+    def __init__(self, database_path: str):
+        self._connection = sqlite3.connect(database_path)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> HistoryStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def ingest(self, path: str, fund: Optional[str] = None, period: Optional[Period] = None) -> bool:
+        """
+        Parses the report and stores its summed holdings, replacing a previous version of the same report.
+        The fund and period default to the ones in a <fund>_<quarter>_<yy> file name.
+
+        :return: False if the same content was already ingested by the same parser version, True otherwise
+        """
+        if fund is None or period is None:
+            match = REPORT_FILE_PATTERN.match(os.path.basename(path))
+            if not match:
+                raise ValueError(f"Can't infer the fund and quarter of {path} - pass them explicitly")
+            fund = fund or match["fund"]
+            period = period or (int(match["year"]), int(match["quarter"]))
+        year, quarter = period
+
+        content_hash = file_digest(path)
+        existing = self._connection.execute(
+            "SELECT content_hash, parser_version FROM reports WHERE fund = ? AND year = ? AND quarter = ?",
+            (fund, year, quarter)).fetchone()
+        if existing == (content_hash, PARSER_VERSION):
+            return False
+
+        with ExcelParser(path) as parser:
+            snapshot = parser.snapshot
+        with self._connection:
+            self._connection.execute("DELETE FROM reports WHERE fund = ? AND year = ? AND quarter = ?",
+                                     (fund, year, quarter))
+            report_id = self._connection.execute(
+                "INSERT INTO reports (fund, year, quarter, path, content_hash, parser_version) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (fund, year, quarter, os.path.abspath(path), content_hash, PARSER_VERSION)).lastrowid
+            self._connection.executemany(
+                f"INSERT INTO holdings (report_id, {_HOLDING_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((report_id, investment.name, investment.category, investment.share_value, investment.securities_id,
+                  investment.issuer_id, investment.currency, investment.nominal_value)
+                 for investment in snapshot.values()))
+        return True
+
+    def ingest_directory(self, directory: str) -> List[QuarterlyReport]:
+        """
+        :return: The reports that were (re-)ingested
+        """
+        return [report for report in reports_from_directory(directory)
+                if self.ingest(report.path, fund=report.fund, period=(report.year, report.quarter))]
+
+    def reports(self, fund: Optional[str] = None) -> List[QuarterlyReport]:
+        query = "SELECT fund, year, quarter, path FROM reports"
+        rows = self._connection.execute(query + " WHERE fund = ?", (fund,)) if fund is not None else \
+            self._connection.execute(query)
+        return sorted(QuarterlyReport(fund=fund, year=year, quarter=quarter, path=path)
+                      for fund, year, quarter, path in rows)
+
+    def snapshot(self, fund: str, period: Period) -> PortfolioSnapshot:
+        year, quarter = period
+        row = self._connection.execute("SELECT id, path FROM reports WHERE fund = ? AND year = ? AND quarter = ?",
+                                       (fund, year, quarter)).fetchone()
+        if row is None:
+            raise KeyError(f"No report of {fund} for {quarter}_{year} was ingested")
+        report_id, path = row
+        investments = (CompanyInvestment(*holding) for holding in self._connection.execute(
+            f"SELECT {_HOLDING_COLUMNS} FROM holdings WHERE report_id = ?", (report_id,)))
+        return PortfolioSnapshot({investment_key(investment): investment for investment in investments}, source=path)
+
+    def changes(self, fund: str, start: Optional[Period] = None,
+                end: Optional[Period] = None) -> List[Tuple[QuarterlyReport, QuarterlyReport, PortfolioDiff]]:
+        """
+        :return: The diff of every two consecutive ingested reports of the fund between start and end, inclusive
+        """
+        reports = [report for report in self.reports(fund)
+                   if (start is None or (report.year, report.quarter) >= start) and
+                   (end is None or (report.year, report.quarter) <= end)]
+        snapshots = {report: self.snapshot(fund, (report.year, report.quarter)) for report in reports}
+        return [(prev_report, report, diff_portfolios(snapshots[prev_report], snapshots[report]))
+                for prev_report, report in zip(reports, reports[1:])]
+
+    def holding_timeline(self, issuer_id: Union[str, int]) -> List[Holding]:
+        """
+        :return: Every holding of the issuer, across all funds, ordered by fund and period
+        """
+        rows = self._connection.execute(
+            f"SELECT fund, year, quarter, {_HOLDING_COLUMNS} FROM holdings "
+            "JOIN reports ON reports.id = holdings.report_id WHERE issuer_id = ? "
+            "ORDER BY fund, year, quarter, securities_id", (id_text(issuer_id),))
+        return [Holding(fund=fund, year=year, quarter=quarter, investment=CompanyInvestment(*investment))
+                for fund, year, quarter, *investment in rows]
+
+    def n_way_diff(self, reports: Sequence[Tuple[str, Period]],
+                   changed_only: bool = True) -> Dict[InvestmentKey, List[Optional[float]]]:
+        """
+        :param reports: (fund, period) of every report to compare
+        :param changed_only: Leave out investments held with the same nominal value in all the reports
+        :return: The nominal value of every investment in each report, None where it isn't held
+        """
+        nominal_values = {}  # type: Dict[InvestmentKey, List[Optional[float]]]
+        for position, (fund, period) in enumerate(reports):
+            for key, investment in self.snapshot(fund, period).items():
+                nominal_values.setdefault(key, [None] * len(reports))[position] = investment.nominal_value
+        if changed_only:
+            return {key: values for key, values in nominal_values.items() if len(set(values)) > 1}
+        return nominal_values
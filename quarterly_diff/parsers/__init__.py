@@ -1 +1,7 @@
 from .excel_parser import ExcelParser, InvestmentPortfolio
+from .layout_registry import LayoutRegistry, SheetLayout, get_default_layout_registry, set_default_layout_registry
+from .parse_observer import ParseObserver, StageTimer, StageTiming, ProgressReporter, observed_stage
+from .portfolio_snapshot import PortfolioSnapshot, InvestmentKey
+from .portfolio_cache import PortfolioCache, get_default_cache, set_default_cache
+from .columnar_portfolio import ColumnarPortfolio, ColumnarDiff, diff_columnar_portfolios
+from .workbook_parser import WorkbookParser, AssetClassPortfolio, ASSET_CLASS_SHEETS
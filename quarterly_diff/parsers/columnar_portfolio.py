@@ -0,0 +1,206 @@
+"""
+An array backed portfolio - one column per CompanyInvestment field instead of one object per holding.
+"""
+from __future__ import annotations
+
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from quarterly_diff.parsers.company_investment import CompanyInvestment
+from quarterly_diff.parsers.portfolio_snapshot import PortfolioSnapshot
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable, Iterator, Sequence
+    from quarterly_diff.parsers.portfolio_snapshot import InvestmentKey
+    from quarterly_diff.parsers.portfolio_cache import InvestmentRow
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _round_column(values: Iterable[float]) -> array:
+    return array("d", (round(value, 2) for value in values))
+
+
+@dataclass
+class ColumnarPortfolio:
+    """
+    Holds a portfolio as parallel columns. The textual key columns are interned, so the many repeated currencies and
+    categories share a single string, and the values are kept in float arrays. Aggregations and diffs work on whole
+    columns, and CompanyInvestment objects are only created as per-row views.
+    """
+    names: List[str]
+    categories: List[str]
+    share_values: array
+    securities_ids: List[str]
+    issuer_ids: List[str]
+    currencies: List[str]
+    nominal_values: array
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[InvestmentRow]) -> ColumnarPortfolio:
+        """
+        :param rows: Tuples of the CompanyInvestment fields, in declaration order. They're consumed one at a time, so
+         only the columns are kept in memory.
+        """
+        portfolio = cls(names=[], categories=[], share_values=array("d"), securities_ids=[], issuer_ids=[],
+                        currencies=[], nominal_values=array("d"))
+        for name, category, share_value, securities_id, issuer_id, currency, nominal_value in rows:
+            portfolio.names.append(name)
+            portfolio.categories.append(_intern(category))
+            portfolio.share_values.append(round(share_value, 2))
+            portfolio.securities_ids.append(_intern(securities_id))
+            portfolio.issuer_ids.append(_intern(issuer_id))
+            portfolio.currencies.append(_intern(currency))
+            portfolio.nominal_values.append(round(nominal_value, 2))
+        return portfolio
+
+    @classmethod
+    def from_columns(cls, columns: Sequence[Any]) -> ColumnarPortfolio:
+        """
+        :param columns: The columns as returned by to_columns
+        """
+        names, categories, share_values, securities_ids, issuer_ids, currencies, nominal_values = columns
+        portfolio = cls(names=names, categories=categories, share_values=array("d"), securities_ids=securities_ids,
+                        issuer_ids=issuer_ids, currencies=currencies, nominal_values=array("d"))
+        portfolio.share_values.frombytes(share_values)
+        portfolio.nominal_values.frombytes(nominal_values)
+        return portfolio
+
+    def to_columns(self) -> Tuple[Any, ...]:
+        """
+        The columns, in CompanyInvestment field order, with the value arrays as bytes - so they can be marshalled.
+        """
+        return (self.names, self.categories, self.share_values.tobytes(), self.securities_ids, self.issuer_ids,
+                self.currencies, self.nominal_values.tobytes())
+
+    @classmethod
+    def from_investments(cls, investments: Iterable[CompanyInvestment]) -> ColumnarPortfolio:
+        return cls.from_rows((investment.name, investment.category, investment.share_value, investment.securities_id,
+                              investment.issuer_id, investment.currency, investment.nominal_value)
+                             for investment in investments)
+
+    def __len__(self) -> int:
+        return len(self.issuer_ids)
+
+    def __getitem__(self, index: int) -> CompanyInvestment:
+        return CompanyInvestment(name=self.names[index], category=self.categories[index],
+                                 share_value=self.share_values[index], securities_id=self.securities_ids[index],
+                                 issuer_id=self.issuer_ids[index], currency=self.currencies[index],
+                                 nominal_value=self.nominal_values[index])
+
+    def __iter__(self) -> Iterator[CompanyInvestment]:
+        return (self[index] for index in range(len(self)))
+
+    def iter_rows(self) -> Iterator[InvestmentRow]:
+        return zip(self.names, self.categories, self.share_values, self.securities_ids, self.issuer_ids,
+                   self.currencies, self.nominal_values)
+
+    def rows(self) -> List[InvestmentRow]:
+        return list(self.iter_rows())
+
+    def keys(self) -> List[InvestmentKey]:
+        return list(zip(self.issuer_ids, self.securities_ids, self.currencies))
+
+    def iter_calculated_fair_values(self) -> Iterator[float]:
+        return (share_value * nominal_value / 100 for share_value, nominal_value in
+                zip(self.share_values, self.nominal_values))
+
+    @property
+    def calculated_fair_values(self) -> array:
+        return array("d", self.iter_calculated_fair_values())
+
+    def take(self, indices: Sequence[int]) -> ColumnarPortfolio:
+        return ColumnarPortfolio(names=[self.names[i] for i in indices],
+                                 categories=[self.categories[i] for i in indices],
+                                 share_values=array("d", (self.share_values[i] for i in indices)),
+                                 securities_ids=[self.securities_ids[i] for i in indices],
+                                 issuer_ids=[self.issuer_ids[i] for i in indices],
+                                 currencies=[self.currencies[i] for i in indices],
+                                 nominal_values=array("d", (self.nominal_values[i] for i in indices)))
+
+    def summed(self) -> ColumnarPortfolio:
+        """
+        Sums the nominal values of rows sharing the same key, like PortfolioSnapshot.from_investments - the name and
+        category of the last row of each key are kept.
+        """
+        groups = {}  # type: Dict[InvestmentKey, int]
+        first_indices = []  # type: List[int]
+        last_indices = []  # type: List[int]
+        nominal_values = array("d")
+        for index, key in enumerate(self.keys()):
+            group = groups.get(key)
+            if group is None:
+                groups[key] = len(first_indices)
+                first_indices.append(index)
+                last_indices.append(index)
+                nominal_values.append(self.nominal_values[index])
+                continue
+            if self.share_values[index] != self.share_values[first_indices[group]]:
+                raise ValueError(f"Different share values! {self.share_values[index]} != "
+                                 f"{self.share_values[first_indices[group]]}")
+            last_indices[group] = index
+            nominal_values[group] = round(self.nominal_values[index] + nominal_values[group], 2)
+
+        summed = self.take(first_indices)
+        summed.names = [self.names[i] for i in last_indices]
+        summed.categories = [self.categories[i] for i in last_indices]
+        summed.nominal_values = nominal_values
+        return summed
+
+    def to_snapshot(self, source: str = "") -> PortfolioSnapshot:
+        """
+        Expects a summed portfolio - every key should appear once.
+        """
+        return PortfolioSnapshot(dict(zip(self.keys(), self)), source=source)
+
+
+@dataclass(frozen=True)
+class ColumnarDiff:
+    """
+    A quarter over quarter diff of two summed ColumnarPortfolios. The delta columns are aligned with held_indices, the
+    (previous quarter, quarter) positions of every investment held in both quarters. Like PortfolioDiff, the updated
+    investments hold the nominal value deltas of the investments whose nominal value changed.
+    """
+    new_investments: ColumnarPortfolio
+    updated_investments: ColumnarPortfolio
+    deprecated_investments: ColumnarPortfolio
+    held_indices: List[Tuple[int, int]]
+    nominal_value_deltas: array
+    share_value_deltas: array
+    fair_value_deltas: array
+
+
+def diff_columnar_portfolios(prev_quarter: ColumnarPortfolio, quarter: ColumnarPortfolio) -> ColumnarDiff:
+    prev_positions = {key: index for index, key in enumerate(prev_quarter.keys())}
+    new_indices = []  # type: List[int]
+    held_indices = []  # type: List[Tuple[int, int]]
+    for index, key in enumerate(quarter.keys()):
+        prev_index = prev_positions.pop(key, None)
+        if prev_index is None:
+            new_indices.append(index)
+        else:
+            held_indices.append((prev_index, index))
+
+    nominal_value_deltas = _round_column(quarter.nominal_values[i] - prev_quarter.nominal_values[prev_i]
+                                         for prev_i, i in held_indices)
+    prev_fair_values = prev_quarter.calculated_fair_values
+    fair_values = quarter.calculated_fair_values
+
+    updated_positions = [position for position, delta in enumerate(nominal_value_deltas) if delta]
+    updated_investments = quarter.take([held_indices[position][1] for position in updated_positions])
+    updated_investments.nominal_values = array("d", (nominal_value_deltas[position]
+                                                     for position in updated_positions))
+    return ColumnarDiff(
+        new_investments=quarter.take(new_indices),
+        updated_investments=updated_investments,
+        deprecated_investments=prev_quarter.take(sorted(prev_positions.values())),
+        held_indices=held_indices,
+        nominal_value_deltas=nominal_value_deltas,
+        share_value_deltas=_round_column(quarter.share_values[i] - prev_quarter.share_values[prev_i]
+                                         for prev_i, i in held_indices),
+        fair_value_deltas=_round_column(fair_values[i] - prev_fair_values[prev_i] for prev_i, i in held_indices),
+    )
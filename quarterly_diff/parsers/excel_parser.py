@@ -1,192 +1,440 @@
 from __future__ import annotations
 
 import os.path
-from typing import TYPE_CHECKING, Dict, Tuple
+import time
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, List, Optional, Tuple, Union
 from functools import cached_property
 
 import openpyxl
 import xlrd
 
 from quarterly_diff.parsers.company_investment import CompanyInvestment
+from quarterly_diff.parsers.columnar_portfolio import ColumnarPortfolio
+from quarterly_diff.parsers.layout_registry import LayoutRegistry, SheetLayout, get_default_layout_registry
+from quarterly_diff.parsers.parse_observer import (AGGREGATE, HEADER_DETECTION, LOAD_CACHE, OPEN_WORKBOOK,
+                                                   PARSE_ROWS, ROWS_PROGRESS_INTERVAL, STORE_CACHE, observed_stage)
+from quarterly_diff.parsers.portfolio_cache import CachedPortfolio, PortfolioCache, get_default_cache, sheet_digest
+from quarterly_diff.parsers.portfolio_snapshot import InvestmentKey, PortfolioSnapshot
+from quarterly_diff.parsers.xls_reader import XLSRows, open_xls_workbook
+from quarterly_diff.parsers.xlsx_reader import XLSXRows, XLSXWorkbook
 
 if TYPE_CHECKING:
-    from typing import Generator, Callable, Any, List
-    from openpyxl.worksheet.worksheet import Worksheet as XLSXWorksheet
-    from openpyxl.worksheet.worksheet import Worksheet as XLSXWorksheet
-    from openpyxl.cell import Cell as XLSXCell
+    from typing import Generator, Iterator, Callable, Sequence
+    from openpyxl.worksheet._read_only import ReadOnlyWorksheet as XLSXWorksheet
     from xlrd.sheet import Sheet as XLSWorksheet
+    from quarterly_diff.parsers.parse_observer import ParseObserver
+    from quarterly_diff.parsers.portfolio_cache import InvestmentRow
+
+InvestmentPortfolio = Dict[InvestmentKey, CompanyInvestment]
+
+HEADERS_ROW_VALUES = ("שם המנפיק/שם נייר ערך", "שם המנפיק / שם נייר ערך", 'שם נ"ע')
+# The prefixes of every column's header, in SheetLayout order
+COLUMNS_HEADERS = (
+    HEADERS_ROW_VALUES,
+    ("מספר מנפיק",),
+    ('מספר נ"ע', "מספר נייר ערך", 'מספר ני"ע'),
+    ("ענף מסחר",),
+    ("ערך נקוב",),
+    ("סוג מטבע",),
+    ("שווי הוגן", "שווי שוק"),
+    ("שער",),
+)
+# The SheetLayout columns an asset sheet may lack, by sheet name - the investment funds sheet has no issuer column
+SHEETS_OPTIONAL_COLUMNS = {
+    "לא סחיר - קרנות השקעה": frozenset(("company_id_idx", "company_category_idx")),
+}
+
+
+def id_text(value: Any) -> str:
+    """
+    Formats an issuer or securities id cell as text, since some funds' reports have numeric ids and others text ids.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Numeric cells of .xls reports are always floats
+    return str(value)
+
+
+class ExcelParser:  # pylint: disable=too-many-instance-attributes
+    """
+    Parses an asset sheet of a quarterly report - by default the non-traded stakes sheet.
+
+    ``.xlsx`` workbooks are opened read-only, so only the stakes sheet is ever decompressed, and ``.xls`` workbooks on
+    demand, so only the stakes sheet is decoded. The sheet is read in a single forward pass which locates the headers
+    row and then yields the investments rows.
+    Parsed portfolios are cached by the report's content hash, and the workbook isn't opened at all on a cache hit.
+    The column positions of a sheet are looked up by its headers row in the layout registry, and matched only for new
+    layouts.
+    """
 
-InvestmentPortfolio = Dict[Tuple[str, str, str], CompanyInvestment]
+    @property
+    def headers_row_idx(self) -> int:
+        row_index, _ = self._headers
+        return row_index if self._file_ext == ".xls" else row_index + 1
 
+    @property
+    def headers_row(self) -> Sequence[Any]:
+        _, row = self._headers
+        return row
 
-class ExcelParser:
     @cached_property
-    def headers_row_idx(self):
-        row_index = self._find_value_row_index("שם המנפיק/שם נייר ערך", "שם המנפיק / שם נייר ערך", 'שם נ"ע')
-        return row_index if self._file_ext == ".xls" else row_index + 1
+    def _headers(self) -> Tuple[int, Sequence[Any]]:
+        with observed_stage(self._observer, self._workbook_path, HEADER_DETECTION):
+            known_row_indices = self._known_row_indices()
+            for index, row in enumerate(self._sheet_rows()):
+                if self._match_headers_row(index, row, known_row_indices):
+                    return index, row
+        raise ValueError(f"None of the values {HEADERS_ROW_VALUES} were found in sheet")
 
     @cached_property
-    def headers_row(self):
-        return self._sheet[self.headers_row_idx]
+    def _layout(self) -> SheetLayout:
+        """
+        The column positions of a sheet whose headers row isn't in the layout registry, matched in a single pass over
+        the headers row.
+        """
+        row_index, row = self._headers
+        columns = [None] * len(COLUMNS_HEADERS)  # type: List[Optional[int]]
+        for i, value in enumerate(row):
+            if not isinstance(value, str):
+                continue
+            for column, headers in enumerate(COLUMNS_HEADERS):
+                if columns[column] is None and value.startswith(headers):
+                    columns[column] = i
+        for field, column_index, headers in zip(SheetLayout._fields, columns, COLUMNS_HEADERS):
+            if column_index is None and field not in self._optional_columns:
+                raise ValueError(f"None of the values {headers} were found in row")
+        layout = SheetLayout(*columns)  # type: ignore[arg-type]
+        if self._layouts is not None:
+            self._layouts.record(row_index, row, layout)
+        return layout
 
-    @cached_property
-    def company_name_idx(self):
-        return self._find_value_index(self.headers_row, "שם המנפיק/שם נייר ערך", "שם המנפיק / שם נייר ערך", 'שם נ"ע')
+    @property
+    def company_name_idx(self) -> int:
+        return self._layout.company_name_idx
 
-    @cached_property
-    def company_id_idx(self):
-        return self._find_value_index(self.headers_row, "מספר מנפיק")
+    @property
+    def company_id_idx(self) -> Optional[int]:
+        return self._layout.company_id_idx
 
-    @cached_property
-    def securities_id_idx(self):
-        return self._find_value_index(self.headers_row, 'מספר נ"ע', "מספר נייר ערך", 'מספר ני"ע')
+    @property
+    def securities_id_idx(self) -> int:
+        return self._layout.securities_id_idx
 
-    @cached_property
-    def company_category_idx(self):
-        return self._find_value_index(self.headers_row, "ענף מסחר")
+    @property
+    def company_category_idx(self) -> Optional[int]:
+        return self._layout.company_category_idx
 
-    @cached_property
-    def nominal_value_idx(self):
-        return self._find_value_index(self.headers_row, "ערך נקוב")
+    @property
+    def nominal_value_idx(self) -> int:
+        return self._layout.nominal_value_idx
 
-    @cached_property
-    def currency_col(self):
-        return self._find_value_index(self.headers_row, "סוג מטבע")
+    @property
+    def currency_col(self) -> int:
+        return self._layout.currency_col
 
-    @cached_property
-    def fair_value_idx(self):
-        return self._find_value_index(self.headers_row, "שווי הוגן", "שווי שוק")
+    @property
+    def fair_value_idx(self) -> int:
+        return self._layout.fair_value_idx
 
-    @cached_property
-    def share_value_idx(self):
-        return self._find_value_index(self.headers_row, "שער")
+    @property
+    def share_value_idx(self) -> int:
+        return self._layout.share_value_idx
 
     EXT_TO_LIB = {
         ".xlsx": openpyxl,
         ".xls": xlrd,
     }
+    # Opens .xlsx workbooks - the fast reader decodes only the parsed columns, with the same values as openpyxl
+    XLSX_BACKENDS = {
+        "openpyxl": lambda path: openpyxl.load_workbook(path, read_only=True),
+        "fast": XLSXWorkbook,
+    }  # type: Dict[str, Callable[[str], Any]]
+    DEFAULT_XLSX_BACKEND = "openpyxl"
     COMPANIES_START_ROW_IDX = 12
     STAKE_SHEET_NAME = "לא סחיר - מניות"
 
-    def __init__(self, workbook_path):
+    def __init__(self, workbook_path, cache: Union[PortfolioCache, bool] = True,  # pylint: disable=too-many-arguments
+                 sheet_name: str = STAKE_SHEET_NAME, *, open_workbook: Optional[Callable[[], Any]] = None,
+                 observer: Optional[ParseObserver] = None, layouts: Union[LayoutRegistry, bool] = True,
+                 xlsx_backend: Optional[str] = None):
+        """
+        :param workbook_path: Path of the quarterly report
+        :param cache: The cache of parsed portfolios to use - True for the default cache, False to always parse
+        :param sheet_name: The asset sheet to parse
+        :param open_workbook: Returns an already opened workbook of the report, to share it with other parsers
+        :param observer: Follows the parsing stages and the rows read
+        :param layouts: The registry of known sheet layouts - True for the default registry, False to always match the
+         columns
+        :param xlsx_backend: The XLSX_BACKENDS reader of .xlsx workbooks, DEFAULT_XLSX_BACKEND by default
+        """
+        self._workbook_path = workbook_path
+        self._sheet_name = sheet_name
+        self._optional_columns = SHEETS_OPTIONAL_COLUMNS.get(sheet_name.strip(), frozenset())
+        self._open_workbook = open_workbook
         self._file_ext = os.path.splitext(workbook_path)[-1]
-        if self._file_ext == ".xls":
-            self._workbook = xlrd.open_workbook(workbook_path)
-            self._sheet: XLSWorksheet = self._workbook.sheet_by_name(self.STAKE_SHEET_NAME)
-        elif self._file_ext == ".xlsx":
-            self._workbook = openpyxl.load_workbook(workbook_path)
-            self._sheet: XLSXWorksheet = self._workbook[self.STAKE_SHEET_NAME]  # type: ignore[no-redef]
-        else:
+        if self._file_ext not in self.EXT_TO_LIB:
             raise ValueError(f"Only .xls and .xlsx files are supported - a {self._file_ext} file was provided")
+        self._xlsx_backend = xlsx_backend or self.DEFAULT_XLSX_BACKEND
+        if self._xlsx_backend not in self.XLSX_BACKENDS:
+            raise ValueError(f"Unknown .xlsx backend {self._xlsx_backend} - expected one of {list(self.XLSX_BACKENDS)}")
+        self._cache = get_default_cache() if cache is True else cache or None
+        self._observer = observer
+        self._layouts = get_default_layout_registry() if layouts is True else layouts or None
 
-    @staticmethod
-    def _find_value_index(row, *values):
-        for i, cell in enumerate(row):
-            if cell.value and any(cell.value.startswith(value) for value in values):
-                return i
-        raise ValueError(f"None of the values {values} were found in row")
+    @cached_property
+    def _workbook(self):
+        # The workbook is only opened when the cache can't provide the portfolio
+        if self._open_workbook is not None:
+            return self._open_workbook()
+        with observed_stage(self._observer, self._workbook_path, OPEN_WORKBOOK):
+            if self._file_ext == ".xls":
+                return open_xls_workbook(self._workbook_path)
+            # Both backends parse a sheet's XML lazily, when its rows are iterated, so the other asset sheets are
+            # never loaded.
+            return self.XLSX_BACKENDS[self._xlsx_backend](self._workbook_path)
 
-    def _find_value_row_index(self, *values):
+    @cached_property
+    def _sheet(self) -> Union[XLSWorksheet, XLSXWorksheet]:
+        sheet_names = self._workbook.sheet_names() if self._file_ext == ".xls" else self._workbook.sheetnames
+        # Some managers pad the sheet names with spaces
+        sheet_name = next((name for name in sheet_names if name.strip() == self._sheet_name.strip()),
+                          self._sheet_name)
         if self._file_ext == ".xls":
-            rows_iter = (self._sheet.row_values(index) for index in range(self._sheet.nrows))
+            return self._workbook.sheet_by_name(sheet_name)
+        return self._workbook[sheet_name]
+
+    def close(self) -> None:
+        if "_workbook" not in self.__dict__:
+            return
+        if self._open_workbook is not None:
+            if self._file_ext == ".xls" and "_sheet" in self.__dict__:
+                # Frees the decoded sheet, and leaves the shared workbook open for the other sheets
+                self._workbook.unload_sheet(self.__dict__.pop("_sheet").name)
+            return
+        if self._file_ext == ".xlsx":
+            self._workbook.close()
         else:
-            rows_iter = self._sheet.iter_rows(values_only=True)
+            self._workbook.release_resources()
+
+    def __enter__(self) -> ExcelParser:
+        return self
 
-        for index, row in enumerate(rows_iter):
-            if any(value in row for value in values):
-                return index
-        raise ValueError(f"None of the values {values} were found in sheet")
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def _is_headers_row(row: Sequence[Any]) -> bool:
+        # Some managers pad the headers with spaces
+        return any(isinstance(value, str) and value.strip() in HEADERS_ROW_VALUES for value in row)
+
+    def _known_row_indices(self) -> FrozenSet[int]:
+        return frozenset(self._layouts.row_indices) if self._layouts is not None else frozenset()
+
+    def _match_headers_row(self, index: int, row: Sequence[Any], known_row_indices: FrozenSet[int]) -> bool:
+        """
+        Checks whether row is the headers row, by the layout registry if a known headers row was found at this index.
+        """
+        if index in known_row_indices:
+            layout = self._layouts.match(index, row)  # type: ignore[union-attr]
+            # A layout recorded for another sheet may lack columns this sheet requires
+            if layout is not None and all(column_index is not None or field in self._optional_columns
+                                          for field, column_index in zip(layout._fields, layout)):
+                self.__dict__["_layout"] = layout  # Resolves the cached property
+                return True
+        return self._is_headers_row(row)
 
     @staticmethod
-    def _get_rows_from_xls(
-            sheet: XLSWorksheet,
-            start_index: int,
-            end_index: int,
-            condition_func: Callable[[list], Any]) -> Generator[list, None, None]:
-        return (sheet.row(index) for index in range(start_index, end_index) if condition_func(sheet.row(index)))
+    def _get_rows_from_xls(sheet: XLSWorksheet) -> Iterator[Sequence[Any]]:
+        return XLSRows(sheet)
 
     @staticmethod
-    def _get_rows_from_xlsx(sheet: XLSXWorksheet,
-                            start_index: int,
-                            end_index: int,
-                            condition_func: Callable[[list], Any]) -> Generator[List[XLSXCell], None, None]:
-        return (list(row) for row in sheet.iter_rows(min_row=start_index, max_row=end_index) if
-                condition_func(list(row)))
-
-    def _get_company_id(self, investment: list) -> str:
-        cell_value = investment[self.company_id_idx].value
+    def _get_rows_from_xlsx(sheet: XLSXWorksheet) -> Iterator[Sequence[Any]]:
+        return sheet.iter_rows(values_only=True)
+
+    def _sheet_rows(self) -> Iterator[Sequence[Any]]:
+        if self._file_ext == ".xls":
+            return self._get_rows_from_xls(self._sheet)  # type: ignore[arg-type]
+        if self._file_ext == ".xlsx":
+            return self._get_rows_from_xlsx(self._sheet)  # type: ignore[arg-type]
+        raise ValueError(f"No defined way to extract rows from {self._file_ext} file")
+
+    def _sheet_total_rows(self) -> Optional[int]:
+        if self._file_ext == ".xls":
+            return self._sheet.nrows
+        return self._sheet.max_row  # Read from the sheet's declared dimensions, which some writers omit
+
+    def _observed_sheet_rows(self, observer: ParseObserver,
+                             sheet_rows: Iterator[Sequence[Any]]) -> Generator[Sequence[Any], None, None]:
+        total_rows = self._sheet_total_rows()
+        rows = 0
+        for rows, row in enumerate(sheet_rows, start=1):
+            if rows % ROWS_PROGRESS_INTERVAL == 0:
+                observer.rows_processed(self._workbook_path, rows, total_rows)
+            yield row
+        observer.rows_processed(self._workbook_path, rows, rows)
+
+    @property
+    def _companies_start_index(self) -> int:
+        # The .xls rows were always counted from 0 and the .xlsx rows from 1
+        return self.COMPANIES_START_ROW_IDX if self._file_ext == ".xls" else self.COMPANIES_START_ROW_IDX - 1
+
+    def _get_company_id(self, investment: Sequence[Any]) -> str:
+        if self.company_id_idx is None or self.company_id_idx >= len(investment):
+            # Read-only rows are trimmed to the sheet's declared dimensions
+            return ""
+        cell_value = investment[self.company_id_idx]
         if isinstance(cell_value, str):
             if "תא ללא תוכן" in cell_value:
                 cell_value = ""
             else:
                 cell_value = cell_value.strip()
-        return cell_value
+        return id_text(cell_value)
 
-    def _get_securities_id(self, investment: list) -> str:
-        cell_value = investment[self.securities_id_idx].value
+    def _get_securities_id(self, investment: Sequence[Any]) -> str:
+        cell_value = investment[self.securities_id_idx]
         if isinstance(cell_value, str):
             if "תא ללא תוכן" in cell_value:
                 cell_value = ""
             else:
                 cell_value = cell_value.strip()
-        return cell_value
+        return id_text(cell_value)
 
-    def _get_nominal_value(self, investment: list) -> float:
-        return investment[self.nominal_value_idx].value
+    def _get_nominal_value(self, investment: Sequence[Any]) -> float:
+        return investment[self.nominal_value_idx]
 
-    def _get_fair_value(self, investment: list, multiplier=1000) -> float:
-        return investment[self.fair_value_idx].value * multiplier
+    def _get_fair_value(self, investment: Sequence[Any], multiplier=1000) -> float:
+        return investment[self.fair_value_idx] * multiplier
 
-    def _get_currency(self, investment: list) -> str:
-        return investment[self.currency_col].value
+    def _get_currency(self, investment: Sequence[Any]) -> str:
+        return investment[self.currency_col]
 
-    def _get_company_name(self, investment: list) -> str:
-        return investment[self.company_name_idx].value
+    def _get_company_name(self, investment: Sequence[Any]) -> str:
+        return investment[self.company_name_idx]
 
-    def _get_company_category(self, investment: list) -> str:
-        return investment[self.company_category_idx].value
+    def _get_company_category(self, investment: Sequence[Any]) -> str:
+        return investment[self.company_category_idx] if self.company_category_idx is not None else ""
 
-    def _get_share_value(self, investment: list) -> float:
-        return investment[self.share_value_idx].value
+    def _get_share_value(self, investment: Sequence[Any]) -> float:
+        return investment[self.share_value_idx]
 
-    @property
-    def _investments_rows(self) -> Generator[list, None, None]:
-        if self._file_ext == ".xls":
-            return self._get_rows_from_xls(self._sheet, self.COMPANIES_START_ROW_IDX, self._sheet.nrows,  # type: ignore
-                                           self._get_company_id)
-        if self._file_ext == ".xlsx":
-            return self._get_rows_from_xlsx(self._sheet, self.COMPANIES_START_ROW_IDX, self._sheet.max_row,
-                                            # type: ignore
-                                            self._get_company_id)
-        raise ValueError(f"No defined way to extract rows from {self._file_ext} file")
+    def _get_row_id(self, investment: Sequence[Any]) -> str:
+        """
+        Investments are the rows with an issuer, or with a security when the sheet has no issuer column.
+        """
+        return self._get_company_id(investment) if self.company_id_idx is not None else \
+            self._get_securities_id(investment)
 
     @property
-    def investments(self) -> Generator[CompanyInvestment, None, None]:
-        return (CompanyInvestment(issuer_id=self._get_company_id(investment),
-                                  nominal_value=self._get_nominal_value(investment),
-                                  share_value=self._get_share_value(investment),
-                                  currency=self._get_currency(investment),
-                                  name=self._get_company_name(investment),
-                                  category=self._get_company_category(investment),
-                                  securities_id=self._get_securities_id(investment)
-                                  ) for investment in
+    def _investments_rows(self) -> Generator[Sequence[Any], None, None]:
+        """
+        Yields the investments rows, locating the headers row on the way so the sheet is only iterated once.
+        """
+        headers_found = "_headers" in self.__dict__
+        start_index = self._companies_start_index
+        known_row_indices = self._known_row_indices()
+        observer = self._observer
+        sheet_rows = rows = self._sheet_rows()
+        if headers_found:
+            self._select_columns(sheet_rows)
+        if observer is not None:
+            rows = self._observed_sheet_rows(observer, sheet_rows)
+            stage_start = time.perf_counter()
+            observer.stage_started(self._workbook_path, PARSE_ROWS if headers_found else HEADER_DETECTION)
+        for index, row in enumerate(rows):
+            if not headers_found:
+                if self._match_headers_row(index, row, known_row_indices):
+                    self._headers = (index, row)
+                    headers_found = True
+                    self._select_columns(sheet_rows)
+                    if observer is not None:
+                        stage_start = self._next_stage(observer, HEADER_DETECTION, stage_start, PARSE_ROWS)
+                continue
+            if index >= start_index and self._get_row_id(row):
+                yield row
+        if not headers_found:
+            raise ValueError(f"None of the values {HEADERS_ROW_VALUES} were found in sheet")
+        if observer is not None:
+            self._next_stage(observer, PARSE_ROWS, stage_start)
+
+    def _select_columns(self, sheet_rows: Iterator[Sequence[Any]]) -> None:
+        """
+        Has the .xls and fast .xlsx readers read only the parsed columns from now on, and skip rows without a row id.
+        """
+        if isinstance(sheet_rows, (XLSRows, XLSXRows)):
+            key_column = self.company_id_idx if self.company_id_idx is not None else self.securities_id_idx
+            sheet_rows.select_columns(self._layout, key_column=key_column)
+
+    def _next_stage(self, observer: ParseObserver, stage: str, stage_start: float,
+                    next_stage: Optional[str] = None) -> float:
+        """
+        Finishes a stage of the sheet's single pass, and starts the next one.
+
+        :return: The start time of the next stage
+        """
+        now = time.perf_counter()
+        observer.stage_finished(self._workbook_path, stage, now - stage_start)
+        if next_stage is not None:
+            observer.stage_started(self._workbook_path, next_stage)
+        return now
+
+    def _parse_rows(self) -> Generator[InvestmentRow, None, None]:
+        """
+        Yields the CompanyInvestment fields of every investment, in declaration order.
+        """
+        return ((self._get_company_name(investment),
+                 self._get_company_category(investment),
+                 self._get_share_value(investment),
+                 self._get_securities_id(investment),
+                 self._get_company_id(investment),
+                 self._get_currency(investment),
+                 self._get_nominal_value(investment),
+                 ) for investment in
                 self._investments_rows)
 
+    def _parse_investments(self) -> Generator[CompanyInvestment, None, None]:
+        return (CompanyInvestment(*row) for row in self._parse_rows())
+
+    @cached_property
+    def _cached_portfolio(self) -> CachedPortfolio:
+        assert self._cache is not None
+        with observed_stage(self._observer, self._workbook_path, LOAD_CACHE):
+            digest = sheet_digest(self._workbook_path, self._sheet_name)
+            portfolio = self._cache.load(digest)
+        if portfolio is not None:
+            if self._observer is not None:
+                rows = len(portfolio.investments)
+                self._observer.rows_processed(self._workbook_path, rows, rows)
+            return portfolio
+        columns = ColumnarPortfolio.from_rows(self._parse_rows())
+        with observed_stage(self._observer, self._workbook_path, AGGREGATE):
+            portfolio = CachedPortfolio(investments=columns, summed_investments=columns.summed())
+        with observed_stage(self._observer, self._workbook_path, STORE_CACHE):
+            self._cache.store(digest, portfolio)
+        return portfolio
+
+    @cached_property
+    def columns(self) -> ColumnarPortfolio:
+        if self._cache is None:
+            return ColumnarPortfolio.from_rows(self._parse_rows())
+        return self._cached_portfolio.investments
+
+    @property
+    def investments(self) -> Iterator[CompanyInvestment]:
+        if self._cache is None:
+            return self._parse_investments()
+        return iter(self._cached_portfolio.investments)
+
+    @cached_property
+    def snapshot(self) -> PortfolioSnapshot:
+        if self._cache is None and self._observer is None:
+            return PortfolioSnapshot.from_investments(self.investments, source=self._workbook_path)
+        if self._cache is None:
+            investments = list(self.investments)  # Read the rows first, so aggregating them is timed on its own
+            with observed_stage(self._observer, self._workbook_path, AGGREGATE):
+                return PortfolioSnapshot.from_investments(investments, source=self._workbook_path)
+        return self._cached_portfolio.summed_investments.to_snapshot(source=self._workbook_path)
+
     @property
     def summed_investments(self) -> InvestmentPortfolio:
-        companies_dict = {}  # type: InvestmentPortfolio
-        for investment in self.investments:
-            companies_dict[(investment.issuer_id, investment.securities_id, investment.currency)] = investment + \
-                                                                                                    companies_dict.get(
-                (investment.issuer_id, investment.securities_id, investment.currency),
-                CompanyInvestment(
-                    issuer_id=investment.issuer_id,
-                    nominal_value=0,
-                    currency=investment.currency,
-                    name=investment.name,
-                    category=investment.category,
-                    share_value=investment.share_value,
-                    securities_id=investment.securities_id,
-                )
-            )
-        return companies_dict
+        return dict(self.snapshot)
@@ -0,0 +1,150 @@
+"""
+A persistent registry of the sheet layouts already seen, so the column positions of a known headers row are looked up
+instead of matched against the header variants.
+
+Every fund manager keeps the same layout from quarter to quarter, so after a manager's first report the headers row is
+recognized by its fingerprint - a hash of its values - at the row it was last found in.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from quarterly_diff.parsers.portfolio_cache import PARSER_VERSION, default_cache_dir
+
+if TYPE_CHECKING:
+    from typing import Any, Sequence
+
+LAYOUTS_PATH_ENV_VAR = "QUARTERLY_DIFF_LAYOUTS_PATH"
+
+
+class SheetLayout(NamedTuple):
+    """
+    The column indices of an asset sheet, by its headers row.
+    """
+    company_name_idx: int
+    company_id_idx: Optional[int]
+    securities_id_idx: int
+    company_category_idx: Optional[int]
+    nominal_value_idx: int
+    currency_col: int
+    fair_value_idx: int
+    share_value_idx: int
+
+
+def layout_fingerprint(row: Sequence[Any]) -> str:
+    """
+    Hashes the values of a headers row the same way for .xls and .xlsx sheets, which differ in how they represent empty
+    cells and how many trailing cells they return.
+    """
+    values = ["" if value is None else str(value).strip() for value in row]
+    while values and not values[-1]:
+        values.pop()
+    return hashlib.sha256("\x1f".join(values).encode()).hexdigest()
+
+
+class LayoutRegistry:
+    """
+    Maps headers row fingerprints to sheet layouts, persisted as a JSON file. Layouts recorded by another parser version
+    are dropped, since the version decides how the columns are matched. Saving merges the layouts other processes
+    recorded in the meantime, so parsers running in parallel don't drop each other's layouts.
+    """
+
+    def __init__(self, path: str, parser_version: str = PARSER_VERSION):
+        self.path = path
+        self.parser_version = parser_version
+        self._layouts = {}  # type: Dict[str, SheetLayout]
+        self._row_indices = {}  # type: Dict[str, int]
+        self._load()
+
+    @property
+    def row_indices(self) -> Set[int]:
+        """
+        The rows the known headers rows were found in.
+        """
+        return set(self._row_indices.values())
+
+    def _read(self) -> Dict[str, Tuple[int, SheetLayout]]:
+        """
+        :return: The row index and layout of every fingerprint in the registry file
+        """
+        entries = {}  # type: Dict[str, Tuple[int, SheetLayout]]
+        try:
+            with open(self.path, encoding="utf-8") as registry_file:
+                registry = json.load(registry_file)
+            if registry.get("parser_version") != self.parser_version:
+                return {}
+            for fingerprint, (row_index, columns) in registry["layouts"].items():
+                entries[fingerprint] = (row_index, SheetLayout(*columns))
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}  # A missing or corrupted registry - the layouts are matched again and recorded
+        return entries
+
+    def _load(self) -> None:
+        for fingerprint, (row_index, layout) in self._read().items():
+            self._layouts[fingerprint] = layout
+            self._row_indices[fingerprint] = row_index
+
+    def match(self, row_index: int, row: Sequence[Any]) -> Optional[SheetLayout]:
+        """
+        :return: The layout of the sheet if row is a known headers row, None otherwise
+        """
+        fingerprint = layout_fingerprint(row)
+        if self._row_indices.get(fingerprint) != row_index:
+            return None
+        return self._layouts[fingerprint]
+
+    def record(self, row_index: int, row: Sequence[Any], layout: SheetLayout) -> None:
+        fingerprint = layout_fingerprint(row)
+        if self._layouts.get(fingerprint) == layout and self._row_indices[fingerprint] == row_index:
+            return
+        self._load()  # Layouts recorded by other processes since this registry was loaded
+        self._layouts[fingerprint] = layout
+        self._row_indices[fingerprint] = row_index
+        self._save()
+
+    def _save(self) -> None:
+        registry = {
+            "parser_version": self.parser_version,
+            "layouts": {fingerprint: [self._row_indices[fingerprint], list(layout)]
+                        for fingerprint, layout in self._layouts.items()},
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        except OSError:
+            return  # Recording layouts is best effort, like caching portfolios
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as temp_file:
+                json.dump(registry, temp_file, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+
+
+_DEFAULT_REGISTRY = []  # type: List[Optional[LayoutRegistry]]  # Holds the default registry once it's resolved
+
+
+def get_default_layout_registry() -> Optional[LayoutRegistry]:
+    """
+    The registry used by ExcelParser unless another one is given. It's saved at $QUARTERLY_DIFF_LAYOUTS_PATH or in the
+    user's cache directory, and setting $QUARTERLY_DIFF_LAYOUTS_PATH to an empty string disables it.
+    """
+    if not _DEFAULT_REGISTRY:
+        path = os.environ.get(LAYOUTS_PATH_ENV_VAR, os.path.join(default_cache_dir(), "layouts.json"))
+        _DEFAULT_REGISTRY.append(LayoutRegistry(path) if path else None)
+    return _DEFAULT_REGISTRY[0]
+
+
+def set_default_layout_registry(registry: Optional[LayoutRegistry]) -> None:
+    """
+    :param registry: The registry ExcelParser should use by default, None disables it
+    """
+    _DEFAULT_REGISTRY[:] = [registry]
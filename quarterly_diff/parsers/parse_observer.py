@@ -0,0 +1,109 @@
+"""
+Hooks for following the stages of parsing and diffing reports - to log their timings or to drive a progress bar.
+
+Observers are optional everywhere, and a parser without one doesn't count or time anything per row.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from typing import Callable, Iterator, Sequence
+
+# The stages of a comparison, in the order they run for every report
+OPEN_WORKBOOK = "open_workbook"
+LOAD_CACHE = "load_cache"
+HEADER_DETECTION = "header_detection"
+PARSE_ROWS = "parse_rows"
+AGGREGATE = "aggregate"
+STORE_CACHE = "store_cache"
+DIFF = "diff"
+EXPORT = "export"
+
+ROWS_PROGRESS_INTERVAL = 500
+
+
+class ParseObserver:
+    """
+    Receives the stages and progress of parsing reports. Subclasses override only the hooks they need.
+    """
+
+    def stage_started(self, source: str, stage: str) -> None:
+        pass
+
+    def stage_finished(self, source: str, stage: str, elapsed: float) -> None:
+        pass
+
+    def rows_processed(self, source: str, rows: int, total_rows: Optional[int]) -> None:
+        """
+        Called every ROWS_PROGRESS_INTERVAL sheet rows and once all the rows are read, or once with the investments
+        rows of a cached portfolio.
+
+        :param total_rows: The rows the sheet declares, if it does
+        """
+
+
+@contextmanager
+def observed_stage(observer: Optional[ParseObserver], source: str, stage: str) -> Iterator[None]:
+    if observer is None:
+        yield
+        return
+    observer.stage_started(source, stage)
+    start = time.perf_counter()
+    yield
+    observer.stage_finished(source, stage, time.perf_counter() - start)
+
+
+class StageTiming(NamedTuple):
+    source: str
+    stage: str
+    elapsed: float
+
+
+class StageTimer(ParseObserver):
+    """
+    Records the time of every stage and the rows read from every report, e.g. for structured logging.
+    """
+
+    def __init__(self):
+        self.timings = []  # type: List[StageTiming]
+        self.rows = {}  # type: Dict[str, int]
+
+    def stage_finished(self, source: str, stage: str, elapsed: float) -> None:
+        self.timings.append(StageTiming(source, stage, elapsed))
+
+    def rows_processed(self, source: str, rows: int, total_rows: Optional[int]) -> None:
+        self.rows[source] = rows
+
+    def totals(self) -> Dict[str, float]:
+        """
+        :return: The total time of every stage, over all the reports
+        """
+        totals = {}  # type: Dict[str, float]
+        for timing in self.timings:
+            totals[timing.stage] = totals.get(timing.stage, 0.0) + timing.elapsed
+        return totals
+
+
+class ProgressReporter(ParseObserver):
+    """
+    Reports the overall progress of parsing several reports, as a fraction between 0 and 1.
+    """
+
+    def __init__(self, sources: Sequence[str], callback: Callable[[float], None]):
+        self._progress = dict.fromkeys(sources, 0.0)
+        self._callback = callback
+
+    def rows_processed(self, source: str, rows: int, total_rows: Optional[int]) -> None:
+        if total_rows and source in self._progress:
+            self._update(source, min(rows / total_rows, 1.0))
+
+    def stage_finished(self, source: str, stage: str, elapsed: float) -> None:
+        if stage == PARSE_ROWS and source in self._progress:
+            self._update(source, 1.0)
+
+    def _update(self, source: str, progress: float) -> None:
+        self._progress[source] = progress
+        self._callback(sum(self._progress.values()) / len(self._progress))
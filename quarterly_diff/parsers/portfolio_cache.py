@@ -0,0 +1,199 @@
+"""
+A persistent cache of parsed portfolios, keyed by the content hash of the report and the version of the parser.
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import pkgutil
+import sys
+import tempfile
+import zlib
+from functools import lru_cache
+from types import CodeType
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from quarterly_diff.parsers.columnar_portfolio import ColumnarPortfolio
+
+CACHE_FORMAT_VERSION = 2
+CACHE_DIR_ENV_VAR = "QUARTERLY_DIFF_CACHE_DIR"
+DEFAULT_MAX_CACHE_SIZE = 256 * 1024 * 1024
+_ENTRY_SUFFIX = ".portfolio"
+
+InvestmentRow = Tuple[Any, ...]  # The CompanyInvestment fields, in declaration order
+
+
+class CachedPortfolio(NamedTuple):
+    investments: ColumnarPortfolio
+    summed_investments: ColumnarPortfolio
+
+
+def file_digest(path: str) -> str:
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=128)
+def _file_digest(path: str, mtime: int, size: int,  # pylint: disable=unused-argument
+                 chunk_size: int = 1024 * 1024) -> str:
+    # The modification time and size are part of the lru_cache key, so an edited report is hashed again
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sheet_digest(path: str, sheet_name: str) -> str:
+    return hashlib.sha256(f"{file_digest(path)}:{sheet_name}".encode()).hexdigest()
+
+
+def _normalized_code(code: CodeType) -> CodeType:
+    """
+    Leaves out of a code object what differs between installs and runs of the same code - its file path, and the
+    iteration order of its frozenset constants, which changes with the string hash seed.
+    """
+    return code.replace(co_filename="", co_consts=tuple(
+        _normalized_code(const) if isinstance(const, CodeType) else
+        tuple(sorted(map(repr, const))) if isinstance(const, frozenset) else const
+        for const in code.co_consts))
+
+
+def _parser_version() -> str:
+    """
+    Hashes the bytecode of the parsers package, so changing the parser invalidates every cached portfolio and recorded
+    layout. The code objects are read through the modules' loaders, which the frozen app's importer supports too.
+    """
+    digest = hashlib.sha256(f"{CACHE_FORMAT_VERSION}:{marshal.version}".encode())
+    package = __name__.rpartition(".")[0]
+    for module in sorted(module.name for module in pkgutil.iter_modules(sys.modules[package].__path__)):
+        name = f"{package}.{module}"
+        spec = importlib.util.find_spec(name)
+        get_code = getattr(spec.loader, "get_code", None) if spec is not None else None
+        code = get_code(name) if get_code is not None else None
+        if code is not None:
+            digest.update(marshal.dumps(_normalized_code(code)))
+    return digest.hexdigest()[:16]
+
+
+PARSER_VERSION = _parser_version()
+
+
+class PortfolioCache:
+    """
+    A size bounded, least recently used, on-disk cache. Entries are zlib compressed marshal dumps, written atomically so
+    several processes can share the same cache directory.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_CACHE_SIZE, parser_version: str = PARSER_VERSION):
+        self.directory = directory
+        self.max_size = max_size
+        self.parser_version = parser_version
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}-{self.parser_version}{_ENTRY_SUFFIX}")
+
+    def _entries(self) -> List[os.DirEntry]:
+        with os.scandir(self.directory) as entries:
+            return [entry for entry in entries if entry.is_file() and entry.name.endswith(_ENTRY_SUFFIX)]
+
+    def load(self, digest: str) -> Optional[CachedPortfolio]:
+        entry_path = self._entry_path(digest)
+        try:
+            with open(entry_path, "rb") as entry:
+                investments, summed_investments = marshal.loads(zlib.decompress(entry.read()))
+            portfolio = CachedPortfolio(investments=ColumnarPortfolio.from_columns(investments),
+                                        summed_investments=ColumnarPortfolio.from_columns(summed_investments))
+            os.utime(entry_path)  # Mark as recently used
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, TypeError, zlib.error):
+            self._remove(entry_path)  # A corrupted entry
+            return None
+        return portfolio
+
+    def store(self, digest: str, portfolio: CachedPortfolio) -> None:
+        try:
+            data = zlib.compress(marshal.dumps((portfolio.investments.to_columns(),
+                                                portfolio.summed_investments.to_columns())))
+        except ValueError:
+            return  # Cells marshal can't encode, like dates, leave the portfolio uncached
+        try:
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return  # Caching is best effort, a missing or read-only cache shouldn't fail the parsing
+        try:
+            with os.fdopen(file_descriptor, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, self._entry_path(digest))
+        except OSError:
+            self._remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes the entries of other parser versions, then the least recently used entries until the cache fits in
+        max_size.
+        """
+        entries = []
+        for entry in self._entries():
+            if not entry.name.endswith(f"-{self.parser_version}{_ENTRY_SUFFIX}"):
+                self._remove(entry.path)
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def clear(self) -> None:
+        for entry in self._entries():
+            self._remove(entry.path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_DEFAULT_CACHE = []  # type: List[Optional[PortfolioCache]]  # Holds the default cache once it's resolved
+
+
+def default_cache_dir() -> str:
+    base_dir = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_dir, "quarterly_diff")
+
+
+def get_default_cache() -> Optional[PortfolioCache]:
+    """
+    The cache used by ExcelParser unless another one is given. It lives in $QUARTERLY_DIFF_CACHE_DIR or in the user's
+    cache directory, and setting $QUARTERLY_DIFF_CACHE_DIR to an empty string disables it.
+    """
+    if not _DEFAULT_CACHE:
+        cache_dir = os.environ.get(CACHE_DIR_ENV_VAR, default_cache_dir())
+        try:
+            _DEFAULT_CACHE.append(PortfolioCache(cache_dir) if cache_dir else None)
+        except OSError:
+            _DEFAULT_CACHE.append(None)
+    return _DEFAULT_CACHE[0]
+
+
+def set_default_cache(cache: Optional[PortfolioCache]) -> None:
+    """
+    :param cache: The cache ExcelParser should use by default, None disables caching
+    """
+    _DEFAULT_CACHE[:] = [cache]
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, Iterator, Mapping, Tuple
+
+from quarterly_diff.parsers.company_investment import CompanyInvestment
+
+if TYPE_CHECKING:
+    from typing import Iterable
+
+InvestmentKey = Tuple[str, str, str]  # (issuer_id, securities_id, currency)
+
+
+def investment_key(investment: CompanyInvestment) -> InvestmentKey:
+    return investment.issuer_id, investment.securities_id, investment.currency
+
+
+class PortfolioSnapshot(Mapping[InvestmentKey, CompanyInvestment]):
+    """
+    The summed investments of a single quarterly report, built once and indexed by (issuer_id, securities_id, currency).
+    """
+    __slots__ = ("_investments", "source")
+
+    def __init__(self, investments: Mapping[InvestmentKey, CompanyInvestment], source: str = ""):
+        self._investments = MappingProxyType(dict(investments))
+        self.source = source
+
+    @classmethod
+    def from_investments(cls, investments: Iterable[CompanyInvestment], source: str = "") -> PortfolioSnapshot:
+        """
+        Sums investments sharing the same key - the name and category of the last row of each key are kept.
+        """
+        summed = {}  # type: Dict[InvestmentKey, CompanyInvestment]
+        for investment in investments:
+            key = investment_key(investment)
+            existing = summed.get(key)
+            summed[key] = investment if existing is None else investment + existing
+        return cls(summed, source=source)
+
+    def __getitem__(self, key: InvestmentKey) -> CompanyInvestment:
+        return self._investments[key]
+
+    def __iter__(self) -> Iterator[InvestmentKey]:
+        return iter(self._investments)
+
+    def __len__(self) -> int:
+        return len(self._investments)
+
+    def __reduce__(self):
+        # The read-only view can't be pickled, so snapshots are sent to and from worker processes as plain dicts
+        return type(self), (dict(self._investments), self.source)
+
+    def __repr__(self) -> str:
+        return f"<PortfolioSnapshot: {self.source} - {len(self)} investments>" if self.source else \
+            f"<PortfolioSnapshot: {len(self)} investments>"
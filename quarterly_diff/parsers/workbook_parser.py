@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import os.path
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+from quarterly_diff.parsers.excel_parser import ExcelParser
+from quarterly_diff.parsers.portfolio_cache import PortfolioCache
+from quarterly_diff.parsers.xls_reader import open_xls_workbook
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable
+    from quarterly_diff.parsers.portfolio_snapshot import PortfolioSnapshot
+
+AssetClassPortfolio = Dict[str, "PortfolioSnapshot"]  # Sheet name to the sheet's summed investments
+
+ASSET_CLASS_SHEETS = {
+    "traded_shares": "מניות",
+    "corporate_bonds": 'אג"ח קונצרני',
+    "etfs": "קרנות סל",
+    "mutual_funds": "קרנות נאמנות",
+    "non_traded_corporate_bonds": 'לא סחיר - אג"ח קונצרני',
+    "non_traded_shares": ExcelParser.STAKE_SHEET_NAME,
+    "investment_funds": "לא סחיר - קרנות השקעה",
+}
+
+
+class WorkbookParser:
+    """
+    Parses several asset sheets of a quarterly report while opening the workbook only once.
+
+    Each sheet gets its own ExcelParser, which detects the sheet's headers layout, and all of them share the single
+    opened workbook - for .xlsx reports each sheet's XML is then read in one forward pass, and .xls sheets are decoded
+    only when they're parsed and unloaded right after. Both openpyxl and xlrd parse in pure Python and hold the GIL, so
+    the sheets are extracted one after the other rather than in threads.
+    """
+
+    def __init__(self, workbook_path: str, sheets: Iterable[str], cache: Union[PortfolioCache, bool] = True,
+                 xlsx_backend: Optional[str] = None):
+        """
+        :param workbook_path: Path of the quarterly report
+        :param sheets: Sheet names, or asset classes from ASSET_CLASS_SHEETS
+        :param cache: The cache of parsed portfolios to use - True for the default cache, False to always parse
+        :param xlsx_backend: The ExcelParser.XLSX_BACKENDS reader of .xlsx workbooks
+        """
+        self._workbook_path = workbook_path
+        self._xlsx_backend = xlsx_backend or ExcelParser.DEFAULT_XLSX_BACKEND
+        self._file_ext = os.path.splitext(workbook_path)[-1]
+        self.sheet_names = list(dict.fromkeys(
+            ASSET_CLASS_SHEETS.get(sheet, sheet) for sheet in sheets))  # type: List[str]
+        self.parsers = {sheet_name: ExcelParser(workbook_path, cache=cache, sheet_name=sheet_name,
+                                                open_workbook=self._open_workbook, xlsx_backend=xlsx_backend)
+                        for sheet_name in self.sheet_names}  # type: Dict[str, ExcelParser]
+
+    def _open_workbook(self) -> Any:
+        # Opened on the first cache miss, then shared by the parsers of all the sheets
+        return self._workbook
+
+    @cached_property
+    def _workbook(self) -> Any:
+        if self._file_ext == ".xls":
+            return open_xls_workbook(self._workbook_path)
+        return ExcelParser.XLSX_BACKENDS[self._xlsx_backend](self._workbook_path)
+
+    @cached_property
+    def snapshots(self) -> AssetClassPortfolio:
+        snapshots = {}  # type: AssetClassPortfolio
+        for sheet_name, parser in self.parsers.items():
+            with parser:  # Releases the sheet once it's parsed
+                snapshots[sheet_name] = parser.snapshot
+        return snapshots
+
+    def close(self) -> None:
+        if "_workbook" not in self.__dict__:
+            return
+        if self._file_ext == ".xlsx":
+            self._workbook.close()
+        else:
+            self._workbook.release_resources()
+
+    def __enter__(self) -> WorkbookParser:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
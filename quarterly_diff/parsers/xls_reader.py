@@ -0,0 +1,64 @@
+"""
+Reads legacy ``.xls`` reports through xlrd, decoding only the sheets that are parsed.
+
+xlrd decodes the BIFF records of a whole sheet at once, so the workbook is opened on demand - the sheets are decoded
+when they are first requested, and can be unloaded once they are parsed. The rows are read the same way the fast
+``.xlsx`` reader reads them: whole until the parsed columns are known, then only up to the last parsed column, and not
+at all when their key column is empty.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import xlrd
+
+if TYPE_CHECKING:
+    from typing import Iterator, Sequence
+    from xlrd.book import Book
+    from xlrd.sheet import Sheet
+
+
+def open_xls_workbook(path: str) -> Book:
+    """
+    Opens a workbook without decoding any of its sheets. It holds the file until its release_resources is called.
+    """
+    return xlrd.open_workbook(path, on_demand=True)
+
+
+class XLSRows:
+    """
+    Iterates a sheet's rows, each read from the sheet once. After select_columns the rows end at the last selected
+    column, and the rows with an empty key column are returned without any values.
+    """
+
+    def __init__(self, sheet: Sheet):
+        self._sheet = sheet
+        self._width = None  # type: Optional[int]
+        self._key_column = 0
+        self._rows = self._iter_rows()
+
+    def __iter__(self) -> XLSRows:
+        return self
+
+    def __next__(self) -> Sequence[Any]:
+        return next(self._rows)
+
+    def select_columns(self, columns: Sequence[Optional[int]], key_column: int) -> None:
+        """
+        :param columns: The 0-based indices of the columns the following rows should have values in
+        :param key_column: Rows with no value in this column are returned without any values
+        """
+        self._width = max(column for column in columns if column is not None) + 1
+        self._key_column = key_column
+
+    def _iter_rows(self) -> Iterator[Sequence[Any]]:
+        sheet = self._sheet
+        empty_rows = {}  # type: Dict[int, Tuple[Any, ...]]
+        for index in range(sheet.nrows):
+            width = self._width
+            if width is None:
+                yield sheet.row_values(index)
+            elif sheet.cell_value(index, self._key_column) == "":
+                yield empty_rows.setdefault(width, ("",) * width)
+            else:
+                yield sheet.row_values(index, 0, width)
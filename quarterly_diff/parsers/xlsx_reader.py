@@ -0,0 +1,319 @@
+"""
+A minimal read-only ``.xlsx`` reader, which streams a sheet's XML straight from the zip without building cell objects.
+
+It returns the same values as openpyxl's read-only worksheets with ``values_only=True``, and once the columns an
+ExcelParser needs are known it decodes only those columns, and not even them in rows whose key column is empty.
+"""
+from __future__ import annotations
+
+import posixpath
+import warnings
+import zipfile
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, List, Optional, Tuple
+from xml.etree.ElementTree import fromstring, iterparse
+
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, from_excel, from_ISO8601
+from openpyxl.worksheet.formula import ArrayFormula, DataTableFormula
+
+if TYPE_CHECKING:
+    from typing import IO, Iterator, Sequence
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_DOC_RELS_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_ROW_TAG = f"{_MAIN_NS}row"
+_VALUE_TAG = f"{_MAIN_NS}v"
+_FORMULA_TAG = f"{_MAIN_NS}f"
+_INLINE_STRING_TAG = f"{_MAIN_NS}is"
+_STRING_ITEM_TAG = f"{_MAIN_NS}si"
+_TEXT_TAG = f"{_MAIN_NS}t"
+_RUN_TAG = f"{_MAIN_NS}r"
+_DIMENSION_TAG = f"{_MAIN_NS}dimension"
+_SHEET_DATA_TAG = f"{_MAIN_NS}sheetData"
+_DIGITS = "0123456789"
+
+
+def _column_index(column_letters: str) -> int:
+    """
+    :return: The 1-based index of a column, e.g. 28 for "AB"
+    """
+    index = 0
+    for letter in column_letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index
+
+
+def _text_content(element: Any) -> str:
+    # The plain text and the text of the formatted runs - phonetic runs aren't part of the content
+    text = element.findtext(_TEXT_TAG)
+    runs = [run.findtext(_TEXT_TAG) or "" for run in element.iterfind(_RUN_TAG)]
+    return (text or "") + "".join(runs) if runs else text or ""
+
+
+def _cast_number(value: str) -> Any:
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+class XLSXWorkbook:
+    """
+    An opened ``.xlsx`` report, with the parts of openpyxl's read-only workbook API the parsers use.
+    """
+
+    def __init__(self, path: str):
+        self._archive = zipfile.ZipFile(path)  # pylint: disable=consider-using-with  # Closed by close()
+        workbook_path = self._relationships("", "_rels/.rels").get("officeDocument", [("", "xl/workbook.xml")])[0][1]
+        workbook = fromstring(self._archive.read(workbook_path))
+        relationships = self._relationships(posixpath.dirname(workbook_path),
+                                            posixpath.join(posixpath.dirname(workbook_path), "_rels",
+                                                           f"{posixpath.basename(workbook_path)}.rels"))
+        targets = {relationship_id: target for sheet_type in ("worksheet", "chartsheet")
+                   for relationship_id, target in relationships.get(sheet_type, [])}
+        archive_names = set(self._archive.namelist())
+        self._sheet_paths = {}  # type: Dict[str, str]
+        for sheet in workbook.iterfind(f"{_MAIN_NS}sheets/{_MAIN_NS}sheet"):
+            sheet_path = targets.get(sheet.get(f"{_DOC_RELS_NS}id", ""))
+            if sheet_path in archive_names:
+                self._sheet_paths[sheet.get("name", "")] = sheet_path
+        properties = workbook.find(f"{_MAIN_NS}workbookPr")
+        date1904 = properties is not None and properties.get("date1904") in ("1", "true")
+        self.epoch = MAC_EPOCH if date1904 else WINDOWS_EPOCH
+        self._shared_strings_path = next(iter(relationships.get("sharedStrings", [])), (None, None))[1]
+        self._styles_path = next(iter(relationships.get("styles", [])), (None, None))[1]
+        self._shared_strings = []  # type: List[str]
+
+    def _relationships(self, folder: str, rels_path: str) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        :return: The (id, archive path) targets of a part's relationships, by the relationship type
+        """
+        relationships = {}  # type: Dict[str, List[Tuple[str, str]]]
+        try:
+            rels = fromstring(self._archive.read(rels_path))
+        except KeyError:
+            return relationships
+        for relationship in rels.iterfind(f"{_RELS_NS}Relationship"):
+            target = relationship.get("Target", "")
+            target = target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+            relationships.setdefault(relationship.get("Type", "").rsplit("/", 1)[-1], []).append(
+                (relationship.get("Id", ""), target))
+        return relationships
+
+    @property
+    def sheetnames(self) -> List[str]:
+        return list(self._sheet_paths)
+
+    def __getitem__(self, sheet_name: str) -> XLSXWorksheet:
+        sheet_path = self._sheet_paths.get(sheet_name)
+        if sheet_path is None:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        return XLSXWorksheet(self, sheet_path)
+
+    @cached_property
+    def _shared_strings_items(self) -> Iterator[Tuple[str, Any]]:
+        if self._shared_strings_path is None:
+            return iter(())
+        return iterparse(self._archive.open(self._shared_strings_path))
+
+    def shared_string(self, index: int) -> str:
+        """
+        The shared strings table is read incrementally, up to the highest string a sheet has asked for so far.
+        """
+        strings = self._shared_strings
+        while index >= len(strings):
+            _, element = next(self._shared_strings_items)
+            if element.tag == _STRING_ITEM_TAG:
+                strings.append(_text_content(element).replace("x005F_", ""))
+                element.clear()
+        return strings[index]
+
+    @cached_property
+    def date_formats(self) -> Tuple[FrozenSet[int], FrozenSet[int]]:
+        """
+        :return: The styles of date cells, and of the ones among them which are time deltas
+        """
+        if self._styles_path is None:
+            return frozenset(), frozenset()
+        stylesheet = Stylesheet.from_tree(fromstring(self._archive.read(self._styles_path)))
+        if not stylesheet.cell_styles:
+            return frozenset(), frozenset()
+        return frozenset(stylesheet.date_formats), frozenset(stylesheet.timedelta_formats)
+
+    def open(self, path: str) -> IO[bytes]:
+        return self._archive.open(path)
+
+    def close(self) -> None:
+        self._archive.close()
+
+
+class XLSXWorksheet:
+    """
+    A sheet of an XLSXWorkbook. Like openpyxl, the rows are padded or trimmed to the sheet's declared dimensions.
+    """
+
+    def __init__(self, workbook: XLSXWorkbook, path: str):
+        self._workbook = workbook
+        self._path = path
+        self.max_row = None  # type: Optional[int]
+        self.max_column = None  # type: Optional[int]
+        self._dimension = None  # type: Optional[str]
+        with workbook.open(path) as source:
+            for event, element in iterparse(source, events=("start", "end")):
+                if event == "end" and element.tag == _DIMENSION_TAG:
+                    self._dimension = element.get("ref")
+                    _, _, self.max_column, self.max_row = range_boundaries(self._dimension)
+                    break
+                if element.tag == _SHEET_DATA_TAG:  # The dimension is declared before the rows, if at all
+                    break
+
+    def iter_rows(self, values_only: bool = True) -> XLSXRows:
+        assert values_only, "Only cell values are read"
+        return XLSXRows(self._workbook, self._workbook.open(self._path), self.max_row, self.max_column)
+
+    def calculate_dimension(self) -> str:
+        if self._dimension is None:
+            raise ValueError("Worksheet is unsized")
+        return self._dimension
+
+
+class XLSXRows:
+    """
+    Iterates a sheet's rows. After select_columns only the selected columns are decoded, and the other values are None.
+    """
+
+    def __init__(self, workbook: XLSXWorkbook, source: IO[bytes], max_row: Optional[int], max_column: Optional[int]):
+        self._workbook = workbook
+        self._max_column = max_column
+        self._shared_formulae = {}  # type: Dict[str, Translator]
+        self._columns = None  # type: Optional[FrozenSet[int]]
+        self._key_column = None  # type: Optional[int]
+        self._rows = self._iter_rows(source, max_row)
+
+    def __iter__(self) -> XLSXRows:
+        return self
+
+    def __next__(self) -> Sequence[Any]:
+        return next(self._rows)
+
+    def select_columns(self, columns: Sequence[Optional[int]], key_column: int) -> None:
+        """
+        :param columns: The 0-based indices of the columns the following rows should have values in
+        :param key_column: Rows with no value in this column are returned without any values
+        """
+        self._columns = frozenset(column + 1 for column in columns if column is not None)
+        self._key_column = key_column + 1
+
+    def _width(self, last_column: int) -> int:
+        # The width openpyxl would give the row - the declared columns, or up to the row's last cell
+        width = self._max_column if self._max_column is not None else last_column
+        if self._columns is not None:
+            width = min(width, max(self._columns))
+        return width
+
+    def _iter_rows(self, source: IO[bytes], max_row: Optional[int]) -> Iterator[Sequence[Any]]:
+        empty_row = (None,) * self._max_column if self._max_column is not None else ()  # type: Tuple[Any, ...]
+        empty_rows = {}  # type: Dict[int, Tuple[Any, ...]]
+        counter = 1
+        row_number = 0
+        with source:
+            for _, element in iterparse(source):
+                if element.tag != _ROW_TAG:
+                    continue
+                row_number = int(float(element.get("r", ""))) if element.get("r") else row_number + 1
+                if max_row is not None and row_number > max_row:
+                    break
+                while counter < row_number:  # Missing rows
+                    counter += 1
+                    yield empty_row if self._columns is None else \
+                        empty_rows.setdefault(self._width(0), (None,) * self._width(0))
+                if counter <= row_number:
+                    counter += 1
+                    yield self._row_values(element, empty_rows)
+                element.clear()
+        if max_row is not None and max_row < row_number:
+            for _ in range(counter, max_row + 1):
+                yield empty_row
+
+    def _row_cells(self, row: Any) -> Tuple[Dict[int, Any], int]:
+        """
+        :return: The row's cells by their 1-based column - only the selected ones if columns were selected - and the
+         column of its last cell
+        """
+        cells = {}
+        columns = self._columns
+        column = 0
+        for cell in row:
+            reference = cell.get("r")
+            column = _column_index(reference.rstrip(_DIGITS)) if reference else column + 1
+            if columns is None or column in columns:
+                cells[column] = cell
+        return cells, column
+
+    def _row_values(self, row: Any, empty_rows: Dict[int, Tuple[Any, ...]]) -> Sequence[Any]:
+        cells, last_column = self._row_cells(row)
+        if not cells and self._max_column is None and self._columns is None:
+            return ()
+        width = self._width(last_column)
+        if self._key_column is not None:
+            key_cell = cells.get(self._key_column)
+            if key_cell is None or (key_cell.find(_VALUE_TAG) is None and key_cell.find(_INLINE_STRING_TAG) is None
+                                    and key_cell.find(_FORMULA_TAG) is None):
+                return empty_rows.setdefault(width, (None,) * width)
+        values = [None] * width  # type: List[Any]
+        for column, cell in cells.items():
+            if column <= width:
+                values[column - 1] = self._cell_value(cell)
+        return tuple(values)
+
+    def _cell_value(self, cell: Any) -> Any:  # pylint: disable=too-many-return-statements
+        """
+        Decodes a cell like openpyxl's WorkSheetParser does, without data_only.
+        """
+        data_type = cell.get("t", "n")
+        formula = cell.find(_FORMULA_TAG)
+        if formula is not None:
+            return self._formula(cell, formula)
+        if data_type == "inlineStr":
+            inline_string = cell.find(_INLINE_STRING_TAG)
+            return _text_content(inline_string) if inline_string is not None else None
+        value = cell.findtext(_VALUE_TAG) or None
+        if value is None:
+            return None
+        if data_type == "n":
+            number = _cast_number(value)
+            style = int(cell.get("s", 0))
+            date_formats, timedelta_formats = self._workbook.date_formats
+            if style not in date_formats:
+                return number
+            try:
+                return from_excel(number, self._workbook.epoch, timedelta=style in timedelta_formats)
+            except (OverflowError, ValueError):
+                warnings.warn(f"Cell {cell.get('r')} is marked as a date but the serial value {number} is outside the "
+                              f"limits for dates. The cell will be treated as an error.")
+                return "#VALUE!"
+        if data_type == "s":
+            return self._workbook.shared_string(int(value))
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return from_ISO8601(value)
+        return value
+
+    def _formula(self, cell: Any, formula: Any) -> Any:
+        value = "=" + (formula.text or "")
+        formula_type = formula.get("t")
+        if formula_type == "array":
+            return ArrayFormula(ref=formula.get("ref"), text=value)
+        if formula_type == "shared":
+            index = formula.get("si")
+            if index in self._shared_formulae:
+                return self._shared_formulae[index].translate_formula(cell.get("r"))
+            if value != "=":
+                self._shared_formulae[index] = Translator(value, cell.get("r"))
+        elif formula_type == "dataTable":
+            return DataTableFormula(**formula.attrib)
+        return value
@@ -1,22 +1,83 @@
-from typing import Tuple
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
 
-from .parsers import ExcelParser, InvestmentPortfolio
+from .parsers import ExcelParser, InvestmentPortfolio, PortfolioSnapshot, InvestmentKey
+from .parsers.company_investment import CompanyInvestment
+from .parsers.parse_observer import DIFF, ParseObserver, observed_stage
+from .parsers.workbook_parser import WorkbookParser
 
 
-def compare_portfolios(prev_quarter_path: str, quarter_path: str) -> Tuple[
-        InvestmentPortfolio, InvestmentPortfolio, InvestmentPortfolio]:
-    prev_quarter = ExcelParser(prev_quarter_path)  # TODO use matching parsers
-    quarter = ExcelParser(quarter_path)
+@dataclass(frozen=True)
+class InvestmentChange:
+    previous: CompanyInvestment
+    current: CompanyInvestment
+
+    @property
+    def nominal_value_delta(self) -> float:
+        return round(self.current.nominal_value - self.previous.nominal_value, 2)
+
+    @property
+    def share_value_delta(self) -> float:
+        return round(self.current.share_value - self.previous.share_value, 2)
+
+    @property
+    def fair_value_delta(self) -> float:
+        return round(self.current.calculated_fair_value - self.previous.calculated_fair_value, 2)
+
+
+@dataclass(frozen=True)
+class PortfolioDiff:
+    new_investments: InvestmentPortfolio
+    updated_investments: InvestmentPortfolio  # Nominal value deltas of investments whose nominal value changed
+    deprecated_investments: InvestmentPortfolio
+    changes: Dict[InvestmentKey, InvestmentChange]  # Held investments whose nominal or share value changed
+
 
+def diff_portfolios(prev_quarter: PortfolioSnapshot, quarter: PortfolioSnapshot) -> PortfolioDiff:
     new_investments = {}  # type: InvestmentPortfolio
     updated_investments = {}  # type: InvestmentPortfolio
-    deprecated_investments = prev_quarter.summed_investments.copy()  # type: InvestmentPortfolio
+    changes = {}  # type: Dict[InvestmentKey, InvestmentChange]
 
-    for key, investment in quarter.summed_investments.items():
-        if key not in prev_quarter.summed_investments:  # New investment
+    for key, investment in quarter.items():
+        prev_investment = prev_quarter.get(key)
+        if prev_investment is None:  # New investment
             new_investments[key] = investment
-        elif investment.nominal_value != prev_quarter.summed_investments[key].nominal_value:
+            continue
+        if investment.nominal_value != prev_investment.nominal_value:
             # Updated investment - nominal value changed
-            updated_investments[key] = investment - prev_quarter.summed_investments[key]
-        deprecated_investments.pop(key, None)
-    return new_investments, updated_investments, deprecated_investments
+            updated_investments[key] = investment - prev_investment
+        if investment.nominal_value != prev_investment.nominal_value or \
+                investment.share_value != prev_investment.share_value:
+            changes[key] = InvestmentChange(previous=prev_investment, current=investment)
+
+    deprecated_investments = {key: investment for key, investment in prev_quarter.items()
+                              if key not in quarter}  # type: InvestmentPortfolio
+    return PortfolioDiff(new_investments=new_investments, updated_investments=updated_investments,
+                         deprecated_investments=deprecated_investments, changes=changes)
+
+
+def compare_portfolios(prev_quarter_path: str, quarter_path: str, observer: Optional[ParseObserver] = None) -> Tuple[
+        InvestmentPortfolio, InvestmentPortfolio, InvestmentPortfolio]:
+    """
+    :param observer: Follows the stages of parsing both reports and diffing them
+    """
+    with ExcelParser(prev_quarter_path, observer=observer) as prev_quarter, \
+            ExcelParser(quarter_path, observer=observer) as quarter:
+        prev_snapshot, snapshot = prev_quarter.snapshot, quarter.snapshot  # TODO use matching parsers
+    with observed_stage(observer, quarter_path, DIFF):
+        diff = diff_portfolios(prev_snapshot, snapshot)
+    return diff.new_investments, diff.updated_investments, diff.deprecated_investments
+
+
+def compare_asset_classes(prev_quarter_path: str, quarter_path: str,
+                          sheets: Iterable[str]) -> Dict[str, PortfolioDiff]:
+    """
+    Diffs several asset sheets of two reports, opening each report once.
+
+    :param sheets: Sheet names, or asset classes from ASSET_CLASS_SHEETS
+    :return: The diff of every sheet, by sheet name
+    """
+    sheets = list(sheets)
+    with WorkbookParser(prev_quarter_path, sheets) as prev_quarter, WorkbookParser(quarter_path, sheets) as quarter:
+        return {sheet_name: diff_portfolios(prev_quarter.snapshots[sheet_name], snapshot)
+                for sheet_name, snapshot in quarter.snapshots.items()}
@@ -0,0 +1,26 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from quarterly_diff.parsers import LayoutRegistry, PortfolioCache, set_default_cache, set_default_layout_registry
+
+PORTFOLIOS_PATH = Path(os.path.dirname(os.path.realpath(__file__))) / "example_portfolios"
+
+
+def get_portfolio_path(company: str, quarter: int, year: int, extension: str = "xlsx") -> str:
+    return str(PORTFOLIOS_PATH / f"{company}_{quarter}_{year}.{extension}")
+
+
+@pytest.fixture(autouse=True, scope="session")
+def portfolio_cache(tmp_path_factory) -> PortfolioCache:
+    cache = PortfolioCache(str(tmp_path_factory.mktemp("portfolio_cache")))
+    set_default_cache(cache)
+    return cache
+
+
+@pytest.fixture(autouse=True, scope="session")
+def layout_registry(tmp_path_factory) -> LayoutRegistry:
+    registry = LayoutRegistry(str(tmp_path_factory.mktemp("layouts") / "layouts.json"))
+    set_default_layout_registry(registry)
+    return registry
@@ -0,0 +1,74 @@
+import csv
+import os
+import shutil
+from pathlib import Path
+
+import openpyxl
+
+from quarterly_diff.batch import SUMMARY_FILE_NAME, pair_consecutive_quarters, reports_from_directory, run_batch
+from quarterly_diff.parsers import StageTimer
+
+from conftest import PORTFOLIOS_PATH
+
+
+def test_reports_from_directory_pairs_consecutive_quarters():
+    reports = reports_from_directory(str(PORTFOLIOS_PATH))
+    pairs = pair_consecutive_quarters(reports)
+    assert {fund for fund, fund_pairs in pairs.items() if fund_pairs} == {"harel", "clal_gemel", "clal_pension",
+                                                                         "phoenix"}
+    (prev_report, report), = pairs["harel"]
+    assert (prev_report.label, report.label) == ("3_22", "4_22")
+    menora_reports = [report for report in reports if report.fund == "menora"]
+    assert [os.path.basename(report.path) for report in menora_reports] == ["menora_4_22.xlsx"]
+
+
+def test_run_batch_reports_failures_without_aborting(tmp_path: Path):
+    reports_dir = tmp_path / "reports"
+    reports_dir.mkdir()
+    for file_name in ("harel_3_22.xlsx", "harel_4_22.xlsx", "phoenix_4_22.xls"):
+        shutil.copy(PORTFOLIOS_PATH / file_name, reports_dir / file_name)
+    (reports_dir / "phoenix_3_22.xlsx").write_bytes(b"not a workbook")
+
+    output_dir = tmp_path / "results"
+    timer = StageTimer()
+    results = run_batch(reports_from_directory(str(reports_dir)), str(output_dir), max_workers=2, observer=timer)
+
+    harel_result, phoenix_result = results
+    assert (harel_result.status, harel_result.new, harel_result.updated) == ("ok", 1, 3)
+    assert phoenix_result.status == "failed" and "phoenix_3_22.xlsx" in phoenix_result.error
+    assert openpyxl.load_workbook(output_dir / "harel.xlsx").sheetnames == [
+        "updated investments 4_22", "new investments 4_22", "deprecated investments 4_22"]
+    assert not (output_dir / "phoenix.xlsx").exists()
+    assert {"diff", "export"} <= set(timer.totals())
+    with open(output_dir / SUMMARY_FILE_NAME, newline="", encoding="utf-8") as summary:
+        assert [row["status"] for row in csv.DictReader(summary)] == ["ok", "failed"]
+
+
+def test_reports_with_missing_quarters_are_skipped(tmp_path: Path):
+    reports_dir = tmp_path / "reports"
+    reports_dir.mkdir()
+    shutil.copy(PORTFOLIOS_PATH / "harel_3_22.xlsx", reports_dir / "harel_1_22.xlsx")
+    shutil.copy(PORTFOLIOS_PATH / "harel_4_22.xlsx", reports_dir / "harel_3_22.xlsx")
+    shutil.copy(PORTFOLIOS_PATH / "harel_4_22.xlsx", reports_dir / "harel_4_22.xlsx")
+    shutil.copy(PORTFOLIOS_PATH / "harel_3_22.xlsx", reports_dir / "harel_1_23.xlsx")
+    reports = reports_from_directory(str(reports_dir))
+    assert [(prev_report.label, report.label) for prev_report, report in pair_consecutive_quarters(reports)["harel"]] \
+        == [("3_22", "4_22"), ("4_22", "1_23")]
+
+    results = run_batch(reports, str(tmp_path / "results"), max_workers=1)
+    assert [(result.previous_quarter, result.quarter, result.status) for result in results] == [
+        ("1_22", "3_22", "skipped"), ("3_22", "4_22", "ok"), ("4_22", "1_23", "ok")]
+    assert "between 1_22 and 3_22" in results[0].error
+
+
+def test_results_are_ordered_across_years(tmp_path: Path):
+    reports_dir = tmp_path / "reports"
+    reports_dir.mkdir()
+    for quarter, example_quarter in (("3_22", "3_22"), ("4_22", "4_22"), ("1_23", "3_22"), ("2_23", "4_22")):
+        shutil.copy(PORTFOLIOS_PATH / f"harel_{example_quarter}.xlsx", reports_dir / f"harel_{quarter}.xlsx")
+
+    results = run_batch(reports_from_directory(str(reports_dir)), str(tmp_path / "results"), max_workers=1)
+    assert [(result.previous_quarter, result.quarter) for result in results] == [
+        ("3_22", "4_22"), ("4_22", "1_23"), ("1_23", "2_23")]
+    with open(tmp_path / "results" / SUMMARY_FILE_NAME, newline="", encoding="utf-8") as summary:
+        assert [row["previous_quarter"] for row in csv.DictReader(summary)] == ["3_22", "4_22", "1_23"]
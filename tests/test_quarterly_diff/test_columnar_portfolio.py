@@ -0,0 +1,55 @@
+from operator import attrgetter
+
+import pytest
+
+from quarterly_diff import ColumnarPortfolio, CompanyInvestment, diff_columnar_portfolios, diff_portfolios
+from quarterly_diff.parsers import ExcelParser
+
+from conftest import PORTFOLIOS_PATH
+
+
+@pytest.mark.parametrize("file_name", ["altshuler_4_22.xlsx", "harel_3_22.xlsx", "phoenix_4_22.xls"])
+def test_columns_match_investments(file_name: str):
+    with ExcelParser(str(PORTFOLIOS_PATH / file_name), cache=False) as parser:
+        investments = list(parser.investments)
+        summed_investments = parser.summed_investments
+        columns = parser.columns
+
+    assert list(columns) == investments
+    summed = columns.summed()
+    assert dict(summed.to_snapshot()) == summed_investments
+    assert [investment.name for investment in summed] == [investment.name for investment in
+                                                          summed_investments.values()]
+    assert list(summed.calculated_fair_values) == pytest.approx(
+        [investment.calculated_fair_value for investment in summed_investments.values()])
+
+
+def test_summed_rejects_different_share_values():
+    columns = ColumnarPortfolio.from_investments([
+        CompanyInvestment(name="a", category="", issuer_id="1", nominal_value=1, share_value=10),
+        CompanyInvestment(name="a", category="", issuer_id="1", nominal_value=1, share_value=20),
+    ])
+    with pytest.raises(ValueError):
+        columns.summed()
+
+
+def test_diff_columnar_portfolios_matches_diff_portfolios():
+    with ExcelParser(str(PORTFOLIOS_PATH / "clal_pension_3_22.xlsx")) as prev_quarter, \
+            ExcelParser(str(PORTFOLIOS_PATH / "clal_pension_4_22.xlsx")) as quarter:
+        diff = diff_portfolios(prev_quarter.snapshot, quarter.snapshot)
+        columnar_diff = diff_columnar_portfolios(prev_quarter.columns.summed(), quarter.columns.summed())
+
+    assert dict(columnar_diff.new_investments.to_snapshot()) == diff.new_investments
+    assert dict(columnar_diff.updated_investments.to_snapshot()) == diff.updated_investments
+    assert dict(columnar_diff.deprecated_investments.to_snapshot()) == diff.deprecated_investments
+    assert len(columnar_diff.held_indices) == len(prev_quarter.snapshot) - len(diff.deprecated_investments)
+
+    prev_keys, keys = prev_quarter.columns.summed().keys(), quarter.columns.summed().keys()
+    held_keys = [keys[i] for _, i in columnar_diff.held_indices]
+    assert held_keys == [prev_keys[prev_i] for prev_i, _ in columnar_diff.held_indices]
+    assert diff.changes
+    for deltas, delta in ((columnar_diff.nominal_value_deltas, attrgetter("nominal_value_delta")),
+                          (columnar_diff.share_value_deltas, attrgetter("share_value_delta")),
+                          (columnar_diff.fair_value_deltas, attrgetter("fair_value_delta"))):
+        # The held investments that aren't in the changes are unchanged
+        assert list(deltas) == [delta(diff.changes[key]) if key in diff.changes else 0 for key in held_keys]
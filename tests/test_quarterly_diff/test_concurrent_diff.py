@@ -0,0 +1,52 @@
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+
+import pytest
+
+from quarterly_diff import ComparisonError, compare_portfolios, compare_portfolios_concurrently, submit_comparison
+from quarterly_diff.parsers import StageTimer
+
+from conftest import PORTFOLIOS_PATH
+PREV_QUARTER_PATH = str(PORTFOLIOS_PATH / "harel_3_22.xlsx")
+QUARTER_PATH = str(PORTFOLIOS_PATH / "harel_4_22.xlsx")
+
+
+def test_concurrent_comparison_matches_compare_portfolios():
+    timer = StageTimer()
+    assert compare_portfolios_concurrently(PREV_QUARTER_PATH, QUARTER_PATH, observer=timer) == \
+        compare_portfolios(PREV_QUARTER_PATH, QUARTER_PATH)
+    assert {timing.source for timing in timer.timings} == {PREV_QUARTER_PATH, QUARTER_PATH}
+    assert timer.timings[-1].stage == "diff"
+
+
+def test_comparison_error_names_the_failed_report(tmp_path: Path):
+    broken_path = str(tmp_path / "broken.xlsx")
+    with open(broken_path, "wb") as broken_file:
+        broken_file.write(b"not a workbook")
+
+    with pytest.raises(ComparisonError) as error_info:
+        compare_portfolios_concurrently(PREV_QUARTER_PATH, broken_path)
+    assert list(error_info.value.errors) == [broken_path]
+
+
+def test_cancel_comparison():
+    comparison = submit_comparison(PREV_QUARTER_PATH, QUARTER_PATH)
+    assert comparison.cancel()
+    assert comparison.cancelled()
+
+
+def test_comparison_timeout():
+    with pytest.raises(FutureTimeoutError):
+        compare_portfolios_concurrently(PREV_QUARTER_PATH, QUARTER_PATH, timeout=0)
+
+
+def test_cancelled_comparison_stops_collecting():
+    threads = threading.active_count()
+    comparison = submit_comparison(PREV_QUARTER_PATH, QUARTER_PATH, observer=StageTimer())
+    assert comparison.cancel()
+    deadline = time.monotonic() + 5
+    while threading.active_count() > threads and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() == threads
@@ -0,0 +1,83 @@
+import pytest
+
+from quarterly_diff import CompanyInvestment, PortfolioSnapshot, compare_portfolios, diff_portfolios
+
+from conftest import get_portfolio_path
+
+
+def _investment(issuer_id, nominal_value, share_value=100.0, securities_id="1"):
+    return CompanyInvestment(name=f"company {issuer_id}", category="", issuer_id=issuer_id,
+                             securities_id=securities_id, nominal_value=nominal_value, share_value=share_value)
+
+
+def _snapshot(size, nominal_value=10.0, share_value=100.0):
+    return PortfolioSnapshot.from_investments(
+        _investment(str(i), nominal_value, share_value) for i in range(size))
+
+
+def test_snapshot_sums_same_key():
+    snapshot = PortfolioSnapshot.from_investments([_investment("1", 10), _investment("1", 5), _investment("2", 1)])
+    assert len(snapshot) == 2
+    assert snapshot[("1", "1", "שקל חדש")].nominal_value == 15
+
+
+def test_snapshot_is_immutable():
+    snapshot = _snapshot(1)
+    with pytest.raises(TypeError):
+        snapshot[("2", "1", "שקל חדש")] = _investment("2", 1)  # type: ignore[index]
+
+
+def test_diff_portfolios():
+    prev_quarter = PortfolioSnapshot.from_investments([_investment("1", 10), _investment("2", 10),
+                                                       _investment("3", 10, share_value=50)])
+    quarter = PortfolioSnapshot.from_investments([_investment("1", 10), _investment("2", 4),
+                                                  _investment("3", 10, share_value=80), _investment("4", 1)])
+    diff = diff_portfolios(prev_quarter, quarter)
+
+    assert list(diff.new_investments) == [("4", "1", "שקל חדש")]
+    assert diff.updated_investments[("2", "1", "שקל חדש")].nominal_value == -6
+    assert not diff.deprecated_investments
+    assert set(diff.changes) == {("2", "1", "שקל חדש"), ("3", "1", "שקל חדש")}
+
+    share_value_change = diff.changes[("3", "1", "שקל חדש")]
+    assert share_value_change.nominal_value_delta == 0
+    assert share_value_change.share_value_delta == 30
+    assert share_value_change.fair_value_delta == 3
+
+
+def test_compare_portfolios():
+    prev_quarter_path = get_portfolio_path(company="harel", quarter=3, year=22)
+    quarter_path = get_portfolio_path(company="harel", quarter=4, year=22)
+    new_investments, updated_investments, deprecated_investments = compare_portfolios(prev_quarter_path, quarter_path)
+    assert list(new_investments) == [("515198976", "12101099", "דולר אמריקאי")]
+    assert {key: investment.nominal_value for key, investment in updated_investments.items()} == {
+        ("520040650", "5490140", "שקל חדש"): -312.09,
+        ("516300985", "12101045", "שקל חדש"): 83911.24,
+        ("516158177", "12101049", "שקל חדש"): 2407949.38,
+    }
+    assert not deprecated_investments
+
+
+def _diff_accesses(size):
+    """
+    Counts the investments diff_portfolios reads from two snapshots of the given size, by key or by iterating them.
+    """
+    accesses = []
+
+    class CountingSnapshot(PortfolioSnapshot):
+        def __getitem__(self, key):
+            accesses.append(key)
+            return super().__getitem__(key)
+
+        def __iter__(self):
+            for key in super().__iter__():
+                accesses.append(key)
+                yield key
+
+    diff_portfolios(CountingSnapshot(_snapshot(size)), CountingSnapshot(_snapshot(size, nominal_value=11)))
+    return len(accesses)
+
+
+def test_diff_portfolios_scales_linearly():
+    # A 10x larger portfolio should read 10x more investments - a quadratic diff would read 100x more
+    assert _diff_accesses(10_000) == 10 * _diff_accesses(1_000)
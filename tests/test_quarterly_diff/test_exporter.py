@@ -0,0 +1,80 @@
+import csv
+import json
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+from quarterly_diff import ColumnarPortfolio, CompanyInvestment, PortfolioSnapshot, diff_portfolios
+from quarterly_diff.exporter import INVESTMENT_FIELDNAMES, diff_sections, export, investment_row, section_rows
+from quarterly_diff.parsers import StageTimer
+
+INVESTMENTS = [
+    CompanyInvestment(name="חברה א", category="השקעות בהייטק", issuer_id="1", securities_id="10", nominal_value=100,
+                      share_value=50),
+    CompanyInvestment(name="חברה ב", category="", issuer_id="2", securities_id="20", nominal_value=10, share_value=1),
+]
+
+
+@pytest.fixture
+def sections():
+    diff = diff_portfolios(PortfolioSnapshot.from_investments(INVESTMENTS[:1]),
+                           PortfolioSnapshot.from_investments(INVESTMENTS))
+    return diff_sections(diff) + [("columnar", ColumnarPortfolio.from_investments(INVESTMENTS))]
+
+
+def test_export_xlsx(tmp_path: Path, sections):
+    output_path = tmp_path / "results.xlsx"
+    export(str(output_path), *sections)
+    workbook = openpyxl.load_workbook(output_path)
+    assert workbook.sheetnames == ["updated investments", "new investments", "deprecated investments", "columnar"]
+    new_investments = workbook["new investments"]
+    assert new_investments.sheet_view.rightToLeft
+    assert [list(row) for row in new_investments.iter_rows(values_only=True)] == [
+        INVESTMENT_FIELDNAMES, ["חברה ב", None, 1, "20", "2", "שקל חדש", 10, 0.1]]
+    assert workbook["columnar"].max_row == 3
+
+
+def test_export_csv(tmp_path: Path, sections):
+    output_path = tmp_path / "results.csv"
+    export(str(output_path), *sections)
+    with open(output_path, newline="", encoding="utf-8-sig") as output:
+        rows = list(csv.DictReader(output))
+    assert [row["section"] for row in rows] == ["new investments", "columnar", "columnar"]
+    assert rows[0]["name"] == "חברה ב"
+
+
+def test_export_jsonl(tmp_path: Path, sections):
+    output_path = tmp_path / "results.jsonl"
+    export(str(output_path), *sections)
+    with open(output_path, encoding="utf-8") as output:
+        records = [json.loads(line) for line in output]
+    assert records[0] == {"name": "חברה ב", "category": "", "share_value": 1, "securities_id": "20",
+                          "issuer_id": "2", "currency": "שקל חדש", "nominal_value": 10,
+                          "calculated_fair_value": 0.1, "section": "new investments"}
+    assert len(records) == 3
+
+
+def test_columnar_section_rows_are_read_as_written():
+    columns = ColumnarPortfolio.from_investments(INVESTMENTS)
+    rows = section_rows(columns)
+    columns.names[1] = "חברה ג"  # The rows are zipped from the columns one at a time, not copied up front
+    assert [row[0] for row in rows] == ["חברה א", "חברה ג"]
+    assert list(section_rows(columns)) == [investment_row(investment) for investment in columns]
+
+
+def test_export_refuses_to_overwrite(tmp_path: Path, sections):
+    output_path = tmp_path / "results.csv"
+    output_path.write_text("")
+    with pytest.raises(FileExistsError):
+        export(str(output_path), *sections, force=False)
+    with pytest.raises(ValueError):
+        export(str(tmp_path / "results.txt"), *sections)
+
+
+def test_export_is_timed(tmp_path: Path, sections):
+    output_path = str(tmp_path / "results.jsonl")
+    timer = StageTimer()
+    export(output_path, *sections, observer=timer)
+    (timing,) = timer.timings
+    assert (timing.source, timing.stage) == (output_path, "export")
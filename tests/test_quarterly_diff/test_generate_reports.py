@@ -0,0 +1,24 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks.generate_reports import write_report
+from quarterly_diff import compare_portfolios
+from quarterly_diff.parsers import ExcelParser
+
+
+@pytest.mark.parametrize("extension", ["xlsx", "xls"])
+def test_synthetic_reports_parse_and_diff(tmp_path: Path, extension: str):
+    if extension == "xls":
+        pytest.importorskip("xlwt")
+    prev_quarter_path = write_report(str(tmp_path / f"synthetic_3_22.{extension}"), 100, filler_rows=10)
+    quarter_path = write_report(str(tmp_path / f"synthetic_4_22.{extension}"), 100, filler_rows=10,
+                                nominal_value_change=0.5)
+
+    with ExcelParser(quarter_path, cache=False) as parser:
+        assert sum(1 for _ in parser.investments) == 100
+        assert len(parser.summed_investments) == 90  # Every 10th holding is split over two rows
+
+    new, updated, deprecated = compare_portfolios(prev_quarter_path, quarter_path)
+    assert not new and not deprecated
+    assert updated
@@ -0,0 +1,66 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from quarterly_diff import diff_portfolios
+from quarterly_diff.history import HistoryStore
+from quarterly_diff.parsers import ExcelParser
+
+from conftest import PORTFOLIOS_PATH
+
+
+@pytest.fixture
+def history_store(tmp_path: Path):
+    reports_dir = tmp_path / "reports"
+    reports_dir.mkdir()
+    for file_name in ("harel_3_22.xlsx", "harel_4_22.xlsx", "phoenix_3_22.xls", "phoenix_4_22.xls"):
+        shutil.copy(PORTFOLIOS_PATH / file_name, reports_dir / file_name)
+    with HistoryStore(str(tmp_path / "history.sqlite")) as store:
+        assert len(store.ingest_directory(str(reports_dir))) == 4
+        yield store
+
+
+def test_ingest_is_idempotent(history_store: HistoryStore):
+    assert not history_store.ingest(str(PORTFOLIOS_PATH / "harel_4_22.xlsx"))
+    assert history_store.ingest(str(PORTFOLIOS_PATH / "harel_3_22.xlsx"), fund="harel", period=(22, 4))
+    assert len(history_store.snapshot("harel", (22, 4))) == 39
+
+
+@pytest.mark.parametrize("fund, file_name", [("phoenix", "phoenix_4_22.xls"), ("meitav", "meitav_4_22.xlsx")])
+def test_snapshot_matches_parser(history_store: HistoryStore, fund: str, file_name: str):
+    # Meitav's report has numeric ids, while Phoenix's ids are text
+    history_store.ingest(str(PORTFOLIOS_PATH / file_name))
+    with ExcelParser(str(PORTFOLIOS_PATH / file_name)) as parser:
+        assert dict(history_store.snapshot(fund, (22, 4))) == parser.summed_investments
+
+
+def test_changes(history_store: HistoryStore):
+    (prev_report, report, diff), = history_store.changes("harel", start=(22, 1), end=(22, 4))
+    assert (prev_report.label, report.label) == ("3_22", "4_22")
+    with ExcelParser(str(PORTFOLIOS_PATH / "harel_3_22.xlsx")) as prev_quarter, \
+            ExcelParser(str(PORTFOLIOS_PATH / "harel_4_22.xlsx")) as quarter:
+        assert diff == diff_portfolios(prev_quarter.snapshot, quarter.snapshot)
+
+
+def test_holding_timeline_and_n_way_diff(history_store: HistoryStore):
+    diff = history_store.changes("harel")[0][2]
+    (issuer_id, securities_id, currency), = list(diff.new_investments)
+    timeline = history_store.holding_timeline(issuer_id)
+    assert ("harel", 22, 4) in [(holding.fund, holding.year, holding.quarter) for holding in timeline]
+
+    n_way_diff = history_store.n_way_diff([("harel", (22, 3)), ("harel", (22, 4))])
+    assert n_way_diff[(issuer_id, securities_id, currency)][0] is None
+    assert set(n_way_diff) == set(diff.new_investments) | set(diff.updated_investments) | \
+        set(diff.deprecated_investments)
+
+
+def test_holding_timeline_across_funds_with_numeric_ids(history_store: HistoryStore):
+    # Meitav's report has numeric ids, while Phoenix's ids are text
+    assert history_store.ingest(str(PORTFOLIOS_PATH / "meitav_4_22.xlsx"))
+    timeline = history_store.holding_timeline(511015448)
+    assert {(holding.fund, holding.year, holding.quarter) for holding in timeline} == \
+        {("meitav", 22, 4), ("phoenix", 22, 3), ("phoenix", 22, 4)}
+    assert history_store.holding_timeline("511015448") == timeline
+    assert all(isinstance(holding.investment.issuer_id, str) for holding in timeline)
+
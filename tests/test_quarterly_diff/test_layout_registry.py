@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from quarterly_diff.parsers import ExcelParser, LayoutRegistry
+
+from conftest import PORTFOLIOS_PATH
+
+
+@pytest.mark.parametrize("file_name", ["harel_4_22.xlsx", "phoenix_4_22.xls"])
+def test_known_layout_skips_column_matching(tmp_path: Path, file_name: str):
+    registry_path = str(tmp_path / "layouts.json")
+    workbook_path = str(PORTFOLIOS_PATH / file_name)
+    with ExcelParser(workbook_path, cache=False, layouts=LayoutRegistry(registry_path)) as parser:
+        parser.headers_row_idx  # pylint: disable=pointless-statement
+        assert "_layout" not in parser.__dict__
+        expected_investments = list(parser.investments)
+
+    with ExcelParser(workbook_path, cache=False, layouts=LayoutRegistry(registry_path)) as parser:
+        parser.headers_row_idx  # pylint: disable=pointless-statement
+        assert "_layout" in parser.__dict__
+        assert list(parser.investments) == expected_investments
+
+
+def test_unknown_layout_is_matched_and_recorded(tmp_path: Path):
+    registry = LayoutRegistry(str(tmp_path / "layouts.json"))
+    with ExcelParser(str(PORTFOLIOS_PATH / "harel_4_22.xlsx"), cache=False, layouts=registry) as parser:
+        list(parser.investments)
+    with ExcelParser(str(PORTFOLIOS_PATH / "meitav_4_22.xlsx"), cache=False, layouts=registry) as parser:
+        assert "_layout" not in parser.__dict__
+        meitav_investments = list(parser.investments)
+
+    assert meitav_investments
+    with open(registry.path, encoding="utf-8") as registry_file:
+        assert len(json.load(registry_file)["layouts"]) == 2
+
+
+def test_registry_of_another_parser_version_is_dropped(tmp_path: Path):
+    registry_path = str(tmp_path / "layouts.json")
+    with ExcelParser(str(PORTFOLIOS_PATH / "harel_4_22.xlsx"), cache=False,
+                     layouts=LayoutRegistry(registry_path, parser_version="old")) as parser:
+        list(parser.investments)
+    assert LayoutRegistry(registry_path, parser_version="old").row_indices
+    assert not LayoutRegistry(registry_path).row_indices
+
+    Path(registry_path).write_text("not json", encoding="utf-8")
+    assert not LayoutRegistry(registry_path).row_indices
+
+
+def test_registries_sharing_a_file_keep_each_others_layouts(tmp_path: Path):
+    registry_path = str(tmp_path / "layouts.json")
+    registries = [LayoutRegistry(registry_path), LayoutRegistry(registry_path)]  # e.g. in two parsing processes
+    for file_name, registry in zip(("harel_4_22.xlsx", "meitav_4_22.xlsx"), registries):
+        with ExcelParser(str(PORTFOLIOS_PATH / file_name), cache=False, layouts=registry) as parser:
+            list(parser.investments)
+
+    with open(registry_path, encoding="utf-8") as registry_file:
+        assert len(json.load(registry_file)["layouts"]) == 2
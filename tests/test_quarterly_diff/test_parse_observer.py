@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+
+from quarterly_diff import compare_portfolios
+from quarterly_diff.parsers import ExcelParser, PortfolioCache, ProgressReporter, StageTimer
+
+from conftest import PORTFOLIOS_PATH
+
+
+@pytest.mark.parametrize("file_name", ["harel_4_22.xlsx", "phoenix_4_22.xls"])
+def test_stage_timer_records_every_stage(file_name: str):
+    workbook_path = str(PORTFOLIOS_PATH / file_name)
+    timer = StageTimer()
+    with ExcelParser(workbook_path, cache=False, observer=timer) as parser:
+        summed_investments = parser.summed_investments
+
+    assert [timing.stage for timing in timer.timings] == ["open_workbook", "header_detection", "parse_rows",
+                                                          "aggregate"]
+    assert all(timing.source == workbook_path and timing.elapsed >= 0 for timing in timer.timings)
+    assert timer.rows[workbook_path] > len(summed_investments)
+
+
+def test_progress_reporter_reaches_completion(tmp_path: Path):
+    prev_quarter_path = str(PORTFOLIOS_PATH / "harel_3_22.xlsx")
+    quarter_path = str(PORTFOLIOS_PATH / "harel_4_22.xlsx")
+    cache = PortfolioCache(str(tmp_path / "cache"))
+    for _ in range(2):  # Parse the reports, then load them from the cache
+        progress = []
+        with ExcelParser(prev_quarter_path, cache=cache, observer=ProgressReporter(
+                [prev_quarter_path, quarter_path], progress.append)) as parser:
+            assert parser.snapshot
+        assert progress[-1] == 0.5
+        assert progress == sorted(progress)
+
+    progress = []
+    expected = compare_portfolios(prev_quarter_path, quarter_path)
+    assert compare_portfolios(prev_quarter_path, quarter_path,
+                              observer=ProgressReporter([prev_quarter_path, quarter_path], progress.append)) == expected
+    assert progress[-1] == 1.0
@@ -1,62 +1,55 @@
-import os
-from pathlib import Path
-
 import pytest
 from _pytest.fixtures import FixtureRequest
 
 from quarterly_diff.parsers import ExcelParser
 
-PORTFOLIOS_PATH = Path(os.path.dirname(os.path.realpath(__file__))) / "example_portfolios"
-
-
-def _get_portfolio_path(company, quarter, year, extension="xlsx"):
-    return str(PORTFOLIOS_PATH / f"{company}_{quarter}_{year}.{extension}")
+from conftest import get_portfolio_path
 
 
 @pytest.fixture
 def menora_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="menora", quarter=4, year=22))
+    return ExcelParser(get_portfolio_path(company="menora", quarter=4, year=22))
 
 
 @pytest.fixture
 def harel_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="harel", quarter=4, year=22))
+    return ExcelParser(get_portfolio_path(company="harel", quarter=4, year=22))
 
 
 @pytest.fixture
 def altshuler_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="altshuler", quarter=4, year=22))
+    return ExcelParser(get_portfolio_path(company="altshuler", quarter=4, year=22))
 
 
 @pytest.fixture
 def phoenix_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="phoenix", quarter=4, year=22, extension="xls"))
+    return ExcelParser(get_portfolio_path(company="phoenix", quarter=4, year=22, extension="xls"))
 
 
 @pytest.fixture
 def clal_gemel_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="clal_gemel", quarter=4, year=22))
+    return ExcelParser(get_portfolio_path(company="clal_gemel", quarter=4, year=22))
 
 
 @pytest.fixture
 def clal_pension_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="clal_pension", quarter=4, year=22))
+    return ExcelParser(get_portfolio_path(company="clal_pension", quarter=4, year=22))
 
 @pytest.fixture
 def meitav_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="meitav", quarter=4, year=22))
+    return ExcelParser(get_portfolio_path(company="meitav", quarter=4, year=22))
 
 @pytest.fixture
 def migdal_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="migdal", quarter=4, year=22))
+    return ExcelParser(get_portfolio_path(company="migdal", quarter=4, year=22))
 
 @pytest.fixture
 def mor_1_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="mor_1", quarter=4, year=22))
+    return ExcelParser(get_portfolio_path(company="mor_1", quarter=4, year=22))
 
 @pytest.fixture
 def mor_2_parser() -> ExcelParser:
-    return ExcelParser(_get_portfolio_path(company="mor_2", quarter=4, year=22))
+    return ExcelParser(get_portfolio_path(company="mor_2", quarter=4, year=22))
 
 
 @pytest.mark.parametrize(
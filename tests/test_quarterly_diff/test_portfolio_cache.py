@@ -0,0 +1,102 @@
+import datetime
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import openpyxl
+
+import quarterly_diff
+from quarterly_diff.parsers import ExcelParser, PortfolioCache
+from quarterly_diff.parsers.portfolio_cache import PARSER_VERSION
+
+from conftest import PORTFOLIOS_PATH
+
+
+def test_cache_hit_skips_workbook(tmp_path: Path):
+    cache = PortfolioCache(str(tmp_path / "cache"))
+    workbook_path = str(PORTFOLIOS_PATH / "harel_4_22.xlsx")
+    with ExcelParser(workbook_path, cache=False) as parser:
+        expected_investments = list(parser.investments)
+        expected_summed_investments = parser.summed_investments
+
+    with ExcelParser(workbook_path, cache=cache) as parser:
+        assert list(parser.investments) == expected_investments
+
+    with ExcelParser(workbook_path, cache=cache) as parser:
+        assert list(parser.investments) == expected_investments
+        assert parser.summed_investments == expected_summed_investments
+        assert list(parser.columns) == expected_investments
+        assert "_workbook" not in parser.__dict__
+
+
+def test_cache_is_keyed_by_content(tmp_path: Path):
+    cache = PortfolioCache(str(tmp_path / "cache"))
+    workbook_path = tmp_path / "report.xlsx"
+    shutil.copy(PORTFOLIOS_PATH / "harel_3_22.xlsx", workbook_path)
+    with ExcelParser(str(workbook_path), cache=cache) as parser:
+        assert len(parser.snapshot) == 39
+
+    shutil.copy(PORTFOLIOS_PATH / "harel_4_22.xlsx", workbook_path)
+    with ExcelParser(str(workbook_path), cache=cache) as parser:
+        assert len(parser.snapshot) == 40
+
+
+def test_cache_evicts_other_parser_versions_and_least_recently_used(tmp_path: Path):
+    workbook_path = str(PORTFOLIOS_PATH / "meitav_4_22.xlsx")
+    old_cache = PortfolioCache(str(tmp_path), parser_version="old")
+    with ExcelParser(workbook_path, cache=old_cache) as parser:
+        assert parser.snapshot
+
+    cache = PortfolioCache(str(tmp_path), max_size=0)
+    with ExcelParser(workbook_path, cache=cache) as parser:
+        assert parser.snapshot
+    assert not os.listdir(tmp_path)
+
+
+def test_corrupted_entry_is_ignored(tmp_path: Path):
+    cache = PortfolioCache(str(tmp_path))
+    workbook_path = str(PORTFOLIOS_PATH / "meitav_4_22.xlsx")
+    with ExcelParser(workbook_path, cache=cache) as parser:
+        expected_snapshot = dict(parser.snapshot)
+    entry_name, = os.listdir(tmp_path)
+    (tmp_path / entry_name).write_bytes(b"garbage")
+    with ExcelParser(workbook_path, cache=cache) as parser:
+        assert dict(parser.snapshot) == expected_snapshot
+
+
+def test_unmarshallable_values_are_not_cached(tmp_path: Path):
+    workbook_path = str(tmp_path / "report.xlsx")
+    with ExcelParser(str(PORTFOLIOS_PATH / "harel_4_22.xlsx"), cache=False) as parser:
+        company_name_column = parser.company_name_idx + 1
+        company_id_idx = parser.company_id_idx
+    workbook = openpyxl.load_workbook(PORTFOLIOS_PATH / "harel_4_22.xlsx")
+    sheet = workbook[ExcelParser.STAKE_SHEET_NAME]
+    investment_row = next(row[0].row for row in sheet.iter_rows() if str(row[company_id_idx].value).isdigit())
+    sheet.cell(investment_row, company_name_column).value = datetime.datetime(2022, 12, 31)
+    workbook.save(workbook_path)
+
+    cache = PortfolioCache(str(tmp_path / "cache"))
+    with ExcelParser(workbook_path, cache=cache) as parser:
+        assert datetime.datetime(2022, 12, 31) in [investment.name for investment in parser.investments]
+    assert not os.listdir(tmp_path / "cache")
+
+
+def test_parser_version_follows_the_parser_code(tmp_path: Path):
+    package_path = tmp_path / "quarterly_diff"
+    shutil.copytree(os.path.dirname(quarterly_diff.__file__), package_path,
+                    ignore=shutil.ignore_patterns("__pycache__"))
+
+    def parser_version() -> str:
+        return subprocess.run(
+            [sys.executable, "-c", "from quarterly_diff.parsers.portfolio_cache import PARSER_VERSION; "
+                                   "print(PARSER_VERSION)"],
+            cwd=tmp_path, env={**os.environ, "PYTHONHASHSEED": "1"}, capture_output=True, text=True,
+            check=True).stdout.strip()
+
+    # The same code at another path and with another hash seed has the same version
+    assert parser_version() == PARSER_VERSION
+    with open(package_path / "parsers" / "xls_reader.py", "a", encoding="utf-8") as xls_reader:
+        xls_reader.write("\nDEFAULT_WIDTH = 1\n")
+    assert parser_version() != PARSER_VERSION
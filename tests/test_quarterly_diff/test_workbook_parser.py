@@ -0,0 +1,70 @@
+import openpyxl
+import pytest
+
+from quarterly_diff import compare_asset_classes, compare_portfolios
+from quarterly_diff.parsers import ExcelParser, WorkbookParser
+
+from conftest import PORTFOLIOS_PATH
+SHEETS = ("traded_shares", "etfs", "non_traded_shares", "investment_funds")
+
+
+@pytest.mark.parametrize("file_name", ["clal_gemel_4_22.xlsx", "altshuler_4_22.xlsx"])
+def test_workbook_parser_opens_workbook_once(file_name: str, monkeypatch: pytest.MonkeyPatch):
+    load_workbook_calls = []
+
+    def load_workbook(*args, **kwargs):
+        load_workbook_calls.append(args)
+        return openpyxl.reader.excel.load_workbook(*args, **kwargs)
+
+    monkeypatch.setattr(openpyxl, "load_workbook", load_workbook)
+    with WorkbookParser(str(PORTFOLIOS_PATH / file_name), SHEETS, cache=False) as workbook_parser:
+        snapshots = workbook_parser.snapshots
+    assert len(load_workbook_calls) == 1
+
+    monkeypatch.undo()
+    for sheet_name, snapshot in snapshots.items():
+        with ExcelParser(str(PORTFOLIOS_PATH / file_name), cache=False, sheet_name=sheet_name) as parser:
+            assert dict(snapshot) == parser.summed_investments
+
+
+def test_sheet_without_issuer_column():
+    with WorkbookParser(str(PORTFOLIOS_PATH / "menora_4_22.xlsx"), ["investment_funds"]) as workbook_parser:
+        snapshot = workbook_parser.snapshots["לא סחיר - קרנות השקעה"]
+    assert len(snapshot) == 283
+    assert all(investment.securities_id and not investment.issuer_id for investment in snapshot.values())
+
+
+def test_compare_asset_classes():
+    prev_quarter_path = str(PORTFOLIOS_PATH / "clal_pension_3_22.xlsx")
+    quarter_path = str(PORTFOLIOS_PATH / "clal_pension_4_22.xlsx")
+    diffs = compare_asset_classes(prev_quarter_path, quarter_path, ["etfs", "non_traded_shares"])
+    assert list(diffs) == ["קרנות סל", "לא סחיר - מניות"]
+    stake_diff = diffs[ExcelParser.STAKE_SHEET_NAME]
+    assert (stake_diff.new_investments, stake_diff.updated_investments, stake_diff.deprecated_investments) == \
+        compare_portfolios(prev_quarter_path, quarter_path)
+
+
+def test_xls_sheets_are_loaded_on_demand():
+    workbook_path = str(PORTFOLIOS_PATH / "menora_4_22.xls")
+    with WorkbookParser(workbook_path, SHEETS, cache=False) as workbook_parser:
+        snapshots = workbook_parser.snapshots
+        workbook = workbook_parser._workbook  # pylint: disable=protected-access
+        assert not any(workbook.sheet_loaded(sheet_name) for sheet_name in workbook.sheet_names())
+
+    with WorkbookParser(str(PORTFOLIOS_PATH / "menora_4_22.xlsx"), SHEETS, cache=False) as workbook_parser:
+        assert {sheet_name: dict(snapshot) for sheet_name, snapshot in workbook_parser.snapshots.items()} == \
+            {sheet_name: dict(snapshot) for sheet_name, snapshot in snapshots.items()}
+
+
+def test_stakes_sheet_requires_issuer_column(tmp_path):
+    workbook_path = str(tmp_path / "report.xlsx")
+    workbook = openpyxl.load_workbook(PORTFOLIOS_PATH / "harel_4_22.xlsx")
+    sheet = workbook[ExcelParser.STAKE_SHEET_NAME]
+    issuer_header, = (cell for row in sheet.iter_rows() for cell in row
+                      if isinstance(cell.value, str) and cell.value.startswith("מספר מנפיק"))
+    issuer_header.value = None
+    workbook.save(workbook_path)
+
+    with ExcelParser(workbook_path, cache=False, layouts=False) as parser:
+        with pytest.raises(ValueError, match="מספר מנפיק"):
+            list(parser.investments)
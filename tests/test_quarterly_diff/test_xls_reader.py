@@ -0,0 +1,21 @@
+from quarterly_diff.parsers import ExcelParser
+from quarterly_diff.parsers.xls_reader import XLSRows, open_xls_workbook
+
+from conftest import PORTFOLIOS_PATH
+
+
+def test_selected_rows_end_at_last_selected_column():
+    workbook = open_xls_workbook(str(PORTFOLIOS_PATH / "phoenix_4_22.xls"))
+    try:
+        sheet = workbook.sheet_by_name(ExcelParser.STAKE_SHEET_NAME)
+        assert not workbook.sheet_loaded("מניות")
+        rows = XLSRows(sheet)
+        assert next(rows) == sheet.row_values(0)
+        rows.select_columns([1, None, 3], key_column=3)
+        for index, row in enumerate(rows, start=1):
+            if sheet.cell_value(index, 3) == "":
+                assert row == ("",) * 4
+            else:
+                assert row == sheet.row_values(index)[:4]
+    finally:
+        workbook.release_resources()
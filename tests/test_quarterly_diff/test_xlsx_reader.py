@@ -0,0 +1,45 @@
+import openpyxl
+import pytest
+
+from quarterly_diff.parsers import ExcelParser, WorkbookParser
+from quarterly_diff.parsers.xlsx_reader import XLSXWorkbook
+
+from conftest import PORTFOLIOS_PATH
+XLSX_PORTFOLIOS = sorted(path.name for path in PORTFOLIOS_PATH.glob("*.xlsx"))
+
+
+@pytest.mark.parametrize("file_name", XLSX_PORTFOLIOS)
+def test_fast_backend_matches_openpyxl(file_name: str):
+    workbook_path = str(PORTFOLIOS_PATH / file_name)
+    parsed = {}
+    for backend in ("openpyxl", "fast"):
+        with ExcelParser(workbook_path, cache=False, layouts=False, xlsx_backend=backend) as parser:
+            parsed[backend] = ([vars(investment) for investment in parser.investments], parser.summed_investments)
+    assert parsed["fast"] == parsed["openpyxl"]
+
+
+def test_fast_reader_rows_match_openpyxl():
+    workbook_path = str(PORTFOLIOS_PATH / "harel_4_22.xlsx")
+    openpyxl_workbook = openpyxl.load_workbook(workbook_path, read_only=True)
+    workbook = XLSXWorkbook(workbook_path)
+    try:
+        assert workbook.sheetnames == openpyxl_workbook.sheetnames
+        for sheet_name in ("מניות", ExcelParser.STAKE_SHEET_NAME):
+            assert list(workbook[sheet_name].iter_rows(values_only=True)) == \
+                list(openpyxl_workbook[sheet_name].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+        openpyxl_workbook.close()
+
+
+def test_fast_backend_shared_between_sheets():
+    workbook_path = str(PORTFOLIOS_PATH / "clal_gemel_4_22.xlsx")
+    sheets = ["traded_shares", "etfs", "non_traded_shares", "investment_funds"]
+    with WorkbookParser(workbook_path, sheets, cache=False) as workbook, \
+            WorkbookParser(workbook_path, sheets, cache=False, xlsx_backend="fast") as fast_workbook:
+        assert fast_workbook.snapshots == workbook.snapshots
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        ExcelParser(str(PORTFOLIOS_PATH / "harel_4_22.xlsx"), xlsx_backend="xlsxwriter")